@@ -7,8 +7,12 @@ from openai import AzureOpenAI
 from app.config import settings
 from app.services.travel_time_service import travel_time_service
 from app.agents.database_agent import DatabaseAgent
+import asyncio
 import logging
 import json
+import copy
+import time
+from collections import OrderedDict
 from pydantic import BaseModel, ValidationError
 
 logger = logging.getLogger(__name__)
@@ -26,6 +30,11 @@ class DestinationSelectionAgent:
         )
         self.deployment_name = settings.AZURE_OPENAI_DEPLOYMENT_NAME
         self.db_agent = DatabaseAgent()
+        # Bounded LRU cache with TTL (same country/days/sites -> same LLM selection);
+        # disabled unless DESTINATION_SELECTION_CACHE_TTL is set
+        self._cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._cache_maxsize: int = 128
+        self._cache_ttl_seconds: int = settings.DESTINATION_SELECTION_CACHE_TTL
     
     async def select_destinations(
         self, 
@@ -42,6 +51,14 @@ class DestinationSelectionAgent:
             if available_sites is None:
                 available_sites = await self.db_agent.search_cities_by_country(country)
 
+            cache_key = None
+            if self._cache_ttl_seconds > 0:
+                cache_key = self._selection_cache_key(country, total_days, available_sites, user_preferences)
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    logger.info(f"Destination selection served from cache for {country} ({total_days} days)")
+                    return cached
+
             # Prepare data for AI (including stringified ID)
             sites_formatted = [
                 {
@@ -64,8 +81,10 @@ class DestinationSelectionAgent:
                 country, total_days, sites_formatted, user_preferences
             )
             
-            # Call AI (force JSON output)
-            response = self.client.chat.completions.create(
+            # Call AI (force JSON output); the sync client runs in a thread so
+            # concurrent selections don't block the event loop
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model=self.deployment_name,
                 messages=[
                     {
@@ -141,6 +160,8 @@ FORMAT:
             
             logger.info(f"AI selected {len(optimized_selection['selected_cities'])} destinations")
             
+            if cache_key is not None and optimized_selection.get("selected_cities"):
+                self._cache_put(cache_key, optimized_selection)
             return optimized_selection
             
         except Exception as e:
@@ -152,6 +173,45 @@ FORMAT:
                 "error": str(e)
             }
     
+    def _cache_get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of a fresh cached selection, dropping it if it has expired.
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["ts"] >= self._cache_ttl_seconds:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return copy.deepcopy(entry["value"])
+    
+    def _cache_put(self, key: tuple, value: Dict[str, Any]) -> None:
+        """
+        Stores a selection, evicting the least recently used entry when full.
+        """
+        self._cache[key] = {"ts": time.monotonic(), "value": copy.deepcopy(value)}
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_maxsize:
+            self._cache.popitem(last=False)
+    
+    def _selection_cache_key(
+        self,
+        country: str,
+        total_days: int,
+        sites: List[Dict[str, Any]],
+        preferences: Dict[str, Any] = None
+    ) -> tuple:
+        """
+        Builds a hashable cache key from the selection inputs.
+        """
+        site_ids = tuple(sorted(
+            str(site.get("_id") or site.get("id") or site.get("site_id") or site.get("name") or "")
+            for site in sites
+        ))
+        preferences_key = json.dumps(preferences, sort_keys=True, default=str) if preferences else ""
+        return ((country or "").lower(), int(total_days), site_ids, preferences_key)
+    
     def _create_selection_prompt(
         self, 
         country: str, 
@@ -7,6 +7,7 @@ from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage
 import logging
 import json
+import re
 from datetime import datetime, timedelta
 
 from .itinerary_detection_agent import ItineraryDetectionAgent
@@ -25,6 +26,22 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Day patterns compiled once: (pattern, fixed days or None to use the captured number, multiplier)
+_DAYS_PATTERNS = [
+    (re.compile(r'(\d+)\s*días?'), None, 1),
+    (re.compile(r'(\d+)\s*days?'), None, 1),
+    (re.compile(r'una semana'), 7, 1),
+    (re.compile(r'one week'), 7, 1),
+    (re.compile(r'(\d+)\s*semanas?'), None, 7),
+    (re.compile(r'(\d+)\s*weeks?'), None, 7),
+    (re.compile(r'fin de semana'), 3, 1),
+    (re.compile(r'weekend'), 3, 1),
+    (re.compile(r'pocos días'), 3, 1),
+    (re.compile(r'few days'), 3, 1),
+    (re.compile(r'varios días'), 5, 1),
+    (re.compile(r'several days'), 5, 1),
+]
+
 # Smart workflow state
 class SmartItineraryState(TypedDict):
     """State of the intelligent itinerary management workflow."""
@@ -668,46 +685,19 @@ Total: {total_cities} {plural}
                 "intention": "error"
             }
 
-    def _extract_days_from_message(self, message: str) -> int:
+    @staticmethod
+    def _extract_days_from_message(message: str) -> int:
         """
         Extrae el número de días del mensaje del usuario.
         """
-        import re
-        
-        # Search for patterns like "7 days", "one week", etc.
-        patterns = [
-            r'(\d+)\s*días?',
-            r'(\d+)\s*days?',
-            r'una semana',
-            r'one week',
-            r'(\d+)\s*semanas?',
-            r'(\d+)\s*weeks?',
-            r'fin de semana',
-            r'weekend',
-            r'pocos días',
-            r'few days',
-            r'varios días',
-            r'several days'
-        ]
-        
         message_lower = message.lower()
         
-        for pattern in patterns:
-            match = re.search(pattern, message_lower)
+        for pattern, fixed_days, multiplier in _DAYS_PATTERNS:
+            match = pattern.search(message_lower)
             if match:
-                if 'semana' in pattern or 'week' in pattern:
-                    if 'una' in pattern or 'one' in pattern:
-                        return 7
-                    else:
-                        return int(match.group(1)) * 7
-                elif 'fin de semana' in pattern or 'weekend' in pattern:
-                    return 3
-                elif 'pocos días' in pattern or 'few days' in pattern:
-                    return 3
-                elif 'varios días' in pattern or 'several days' in pattern:
-                    return 5
-                else:
-                    return int(match.group(1))
+                if fixed_days is not None:
+                    return fixed_days
+                return int(match.group(1)) * multiplier
         
         # If no specific information is found, analyze the context
         context_keywords = {
@@ -75,6 +75,9 @@ class Settings(BaseSettings):
     # WebSocket settings
     WS_URL: str = "ws://localhost:8000"
 
+    # Destination selection cache TTL in seconds (0 disables it)
+    DESTINATION_SELECTION_CACHE_TTL: int = int(os.getenv("DESTINATION_SELECTION_CACHE_TTL", "0"))
+
     # Demo / Mock mode
     MOCK_MODE: bool = os.getenv("MOCK_MODE", "False").lower() == "true"
 
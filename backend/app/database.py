@@ -10,6 +10,9 @@ client: Optional[AsyncIOMotorClient] = None
 # Database instance
 db = None
 
+# Compound index backing the {"entity_type": ..., "subtype": ...} site filters
+SITES_ENTITY_SUBTYPE_INDEX = "entity_subtype_idx"
+
 async def connect_to_mongodb():
     """Connect to MongoDB database."""
     global client, db
@@ -21,10 +24,21 @@ async def connect_to_mongodb():
         await client.admin.command('ping')
         db = client[settings.DATABASE_NAME]
         logger.info("Successfully connected to MongoDB")
+        await ensure_sites_indexes()
     except Exception as e:
         logger.error(f"Error connecting to MongoDB: {str(e)}")
         raise
 
+async def ensure_sites_indexes():
+    """Create the indexes used by the sites queries (idempotent)."""
+    try:
+        await client[settings.DATABASE_NAME].sites.create_index(
+            [("entity_type", 1), ("subtype", 1)],
+            name=SITES_ENTITY_SUBTYPE_INDEX
+        )
+    except Exception as e:
+        logger.warning(f"Index creation warning: {e}")
+
 async def close_mongodb_connection():
     """Close MongoDB connection."""
     global client
@@ -3,8 +3,9 @@ Service for calculating travel times between cities.
 """
 
 import math
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +62,55 @@ class TravelTimeService:
             logger.error(f"Error calculando distancia: {e}")
             return 0
     
+    def _segment_bands(self) -> List[Tuple[float, str, float, float, float]]:
+        """
+        Transport heuristic by distance: (upper bound km, method, speed km/h, station time h, airport time h).
+        """
+        return [
+            (80, "private_car", self.speeds["private_car"], self.additional_times["local_transport"], 0),
+            (200, "intercity_bus", self.speeds["intercity_bus"], self.additional_times["bus_station"], 0),
+            (700, "train", self.speeds["train"], self.additional_times["train_station"], 0),
+            (2000, "flight", self.speeds["flight_short"], 0, self.additional_times["airport_checkin_domestic"]),
+            (math.inf, "flight", self.speeds["flight_long"], 0, self.additional_times["airport_checkin_international"]),
+        ]
+    
+    def _transport_for_distance(self, distance: float) -> Tuple[str, float, float, float]:
+        """
+        Returns (method, speed, station time, airport time) for a distance in km.
+        """
+        for upper_bound, method, speed, station_time, airport_time in self._segment_bands():
+            if distance < upper_bound:
+                return method, speed, station_time, airport_time
+        return self._segment_bands()[-1][1:]
+    
+    @staticmethod
+    def _lat_lon(coord: Dict[str, float]) -> Optional[Tuple[float, float]]:
+        try:
+            return float(coord["latitude"]), float(coord["longitude"])
+        except Exception:
+            return None
+    
+    def calculate_route_distances_km(self, cities: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized Haversine distances in km between consecutive cities.
+        Also returns a mask of segments where a city has no coordinates.
+        """
+        coords_list = [city.get("coordinates") or {} for city in cities]
+        lat_lons = [self._lat_lon(coord) for coord in coords_list]
+        missing = np.array([not coord for coord in coords_list])
+        invalid = np.array([lat_lon is None for lat_lon in lat_lons])
+        
+        coords = np.radians(np.array([lat_lon or (0.0, 0.0) for lat_lon in lat_lons], dtype=np.float64))
+        lat, lon = coords[:, 0], coords[:, 1]
+        dlat = np.diff(lat)
+        dlon = np.diff(lon)
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+        distances = 2 * 6371 * np.arcsin(np.sqrt(a))
+        
+        # Same fallback as calculate_distance_km for malformed coordinates
+        distances[invalid[:-1] | invalid[1:]] = 0
+        return distances, missing[:-1] | missing[1:]
+    
     def estimate_travel_time(self, city1: Dict[str, Any], city2: Dict[str, Any]) -> Dict[str, Any]:
         """
         Estima tiempo real de viaje entre dos ciudades.
@@ -83,27 +133,8 @@ class TravelTimeService:
             distance = self.calculate_distance_km(coord1, coord2)
             
             # Determine transport method and time (heuristic by segments)
-            if distance < 80:
-                method = "private_car"
-                duration = distance / self.speeds[method] + self.additional_times["local_transport"]
-                airport_time = 0
-            elif distance < 200:
-                method = "intercity_bus"
-                duration = distance / self.speeds[method] + self.additional_times["bus_station"]
-                airport_time = 0
-            elif distance < 700:
-                method = "train"
-                duration = distance / self.speeds[method] + self.additional_times["train_station"]
-                airport_time = 0
-            elif distance < 2000:
-                method = "flight"
-                duration = distance / self.speeds["flight_short"]
-                airport_time = self.additional_times["airport_checkin_domestic"]
-            else:
-                method = "flight"
-                duration = distance / self.speeds["flight_long"]
-                airport_time = self.additional_times["airport_checkin_international"]
-            
+            method, speed, station_time, airport_time = self._transport_for_distance(distance)
+            duration = distance / speed + station_time
             total_time = duration + airport_time
             
             return {
@@ -135,19 +166,43 @@ class TravelTimeService:
                 "segments": []
             }
         
+        distances, missing = self.calculate_route_distances_km(cities)
+        
+        # Vectorized method selection by distance band
+        bands = self._segment_bands()
+        band_index = np.searchsorted([band[0] for band in bands], distances, side="right")
+        speeds = np.array([band[2] for band in bands])[band_index]
+        station_times = np.array([band[3] for band in bands])[band_index]
+        airport_times = np.array([band[4] for band in bands])[band_index]
+        durations = distances / speeds + station_times
+        total_times = durations + airport_times
+        
         total_time = 0
         segments = []
         
         for i in range(len(cities) - 1):
-            city1 = cities[i]
-            city2 = cities[i + 1]
-            
-            travel_info = self.estimate_travel_time(city1, city2)
+            if missing[i]:
+                travel_info = {
+                    "method": "unknown",
+                    "duration": 0,
+                    "airport_time": 0,
+                    "total_time": 0,
+                    "distance": 0
+                }
+            else:
+                band = bands[band_index[i]]
+                travel_info = {
+                    "method": band[1],
+                    "duration": round(float(durations[i]), 2),
+                    "airport_time": band[4],
+                    "total_time": round(float(total_times[i]), 2),
+                    "distance": round(float(distances[i]), 2)
+                }
             total_time += travel_info["total_time"]
             
             segments.append({
-                "from": city1.get("name", "Unknown"),
-                "to": city2.get("name", "Unknown"),
+                "from": cities[i].get("name", "Unknown"),
+                "to": cities[i + 1].get("name", "Unknown"),
                 "travel_info": travel_info
             })
         
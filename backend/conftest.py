@@ -0,0 +1,23 @@
+"""
+Fixtures compartidas de pytest para los scripts de prueba del backend.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest_asyncio
+
+# Configurar el path
+backend_dir = Path(__file__).parent.absolute()
+sys.path.insert(0, str(backend_dir))
+
+from tests import _bootstrap  # noqa: F401
+
+from app.database import connect_to_mongodb, close_mongodb_connection, get_database
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def mongo_db():
+    """Una única conexión a MongoDB compartida por todos los tests de la sesión."""
+    await connect_to_mongodb()
+    yield await get_database()
+    await close_mongodb_connection()
@@ -3,7 +3,8 @@
 Script para verificar el estado del servidor.
 """
 
-import requests
+import asyncio
+import httpx
 import json
 import sys
 import os
@@ -13,39 +14,53 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.absolute()
 sys.path.insert(0, str(backend_dir))
 
-def test_server_status():
+from tests import _bootstrap  # noqa: F401
+
+BASE_URL = "http://localhost:8000"
+
+async def test_server_status():
     """Verifica el estado del servidor."""
-    try:
-        # Test 1: Verificar que el servidor esté corriendo
-        print("🔍 Verificando estado del servidor...")
-        
-        response = requests.get("http://localhost:8000/", timeout=5)
-        if response.status_code == 200:
-            print("✅ Servidor está corriendo correctamente")
-            print(f"   Respuesta: {response.json()}")
-        else:
-            print(f"❌ Servidor respondió con código: {response.status_code}")
-            return False
-            
-    except requests.exceptions.ConnectionError:
-        print("❌ No se puede conectar al servidor en http://localhost:8000")
+    # Usar un travel_id de prueba
+    test_travel_id = "test_travel_123"
+    
+    print("🔍 Verificando estado del servidor...")
+    
+    # Un único cliente (keep-alive) para las tres comprobaciones, lanzadas en paralelo
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=5) as client:
+        root_response, sites_response, itinerary_response = await asyncio.gather(
+            client.get("/"),
+            client.get("/api/travels/sites/available", params={"country_code": "TH"}),
+            client.get(f"/api/travels/{test_travel_id}/itinerary"),
+            return_exceptions=True
+        )
+    
+    # Test 1: Verificar que el servidor esté corriendo
+    if isinstance(root_response, httpx.ConnectError):
+        print(f"❌ No se puede conectar al servidor en {BASE_URL}")
         print("   Asegúrate de que el servidor esté ejecutándose con: python start_server.py")
         return False
-    except Exception as e:
-        print(f"❌ Error verificando servidor: {e}")
+    if isinstance(root_response, Exception):
+        print(f"❌ Error verificando servidor: {root_response}")
+        return False
+    if root_response.status_code == 200:
+        print("✅ Servidor está corriendo correctamente")
+        print(f"   Respuesta: {root_response.json()}")
+    else:
+        print(f"❌ Servidor respondió con código: {root_response.status_code}")
         return False
     
     # Test 2: Verificar endpoint de sitios disponibles
     try:
         print("\n🔍 Verificando endpoint de sitios...")
         
-        response = requests.get("http://localhost:8000/api/travels/sites/available?country_code=TH", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
+        if isinstance(sites_response, Exception):
+            raise sites_response
+        if sites_response.status_code == 200:
+            data = sites_response.json()
             print(f"✅ Endpoint de sitios funciona")
             print(f"   Sitios encontrados: {data.get('total_count', 0)}")
         else:
-            print(f"❌ Endpoint de sitios falló: {response.status_code}")
+            print(f"❌ Endpoint de sitios falló: {sites_response.status_code}")
             
     except Exception as e:
         print(f"❌ Error verificando endpoint de sitios: {e}")
@@ -54,17 +69,15 @@ def test_server_status():
     try:
         print("\n🔍 Verificando endpoint de itinerarios...")
         
-        # Usar un travel_id de prueba
-        test_travel_id = "test_travel_123"
-        response = requests.get(f"http://localhost:8000/api/travels/{test_travel_id}/itinerary", timeout=5)
-        
-        if response.status_code in [200, 404]:
-            print(f"✅ Endpoint de itinerarios responde (código: {response.status_code})")
-            if response.status_code == 200:
-                data = response.json()
+        if isinstance(itinerary_response, Exception):
+            raise itinerary_response
+        if itinerary_response.status_code in [200, 404]:
+            print(f"✅ Endpoint de itinerarios responde (código: {itinerary_response.status_code})")
+            if itinerary_response.status_code == 200:
+                data = itinerary_response.json()
                 print(f"   Itinerarios encontrados: {len(data)}")
         else:
-            print(f"❌ Endpoint de itinerarios falló: {response.status_code}")
+            print(f"❌ Endpoint de itinerarios falló: {itinerary_response.status_code}")
             
     except Exception as e:
         print(f"❌ Error verificando endpoint de itinerarios: {e}")
@@ -73,4 +86,4 @@ def test_server_status():
     return True
 
 if __name__ == "__main__":
-    test_server_status() 
\ No newline at end of file
+    asyncio.run(test_server_status()) 
@@ -4,8 +4,7 @@ Script para probar la funcionalidad de WebSocket.
 """
 
 import asyncio
-import websockets
-import json
+import orjson
 import sys
 import os
 from pathlib import Path
@@ -14,35 +13,33 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.absolute()
 sys.path.insert(0, str(backend_dir))
 
+from tests import _bootstrap  # noqa: F401
+from tests.ws_driver import run_ws_tests
+
 async def test_websocket():
     """Prueba la funcionalidad de WebSocket."""
     try:
         # URL del WebSocket (ajusta según tu configuración)
         uri = "ws://localhost:8000/api/travels/test_travel_id/ws?token=test_token"
         
-        print(f"🔌 Conectando a: {uri}")
-        
-        async with websockets.connect(uri) as websocket:
-            print("✅ Conexión WebSocket establecida")
-            
-            # Enviar mensaje de prueba
-            test_message = {
+        # Mensajes de prueba
+        test_messages = [
+            {
                 "type": "message",
                 "data": {
                     "message": "Design me a trip to Thailand",
                     "is_user": True
                 }
             }
-            
-            print(f"📤 Enviando mensaje: {test_message}")
-            await websocket.send(json.dumps(test_message))
-            
-            # Recibir respuesta
-            response = await websocket.recv()
+        ]
+        
+        responses = await run_ws_tests(uri, test_messages)
+        
+        for response in responses:
             print(f"📥 Respuesta recibida: {response}")
             
             # Parsear respuesta
-            response_data = json.loads(response)
+            response_data = orjson.loads(response)
             print(f"📋 Tipo de respuesta: {response_data.get('type')}")
             print(f"💬 Mensaje: {response_data.get('data', {}).get('message', 'Sin mensaje')}")
             
@@ -5,7 +5,7 @@ Script para probar el WebSocket en tiempo real.
 
 import asyncio
 import websockets
-import json
+import orjson
 import sys
 import os
 from pathlib import Path
@@ -14,6 +14,9 @@ from pathlib import Path
 backend_dir = Path(__file__).parent.absolute()
 sys.path.insert(0, str(backend_dir))
 
+from tests import _bootstrap  # noqa: F401
+from tests.ws_driver import run_ws_tests
+
 async def test_websocket():
     """Prueba la conexión WebSocket."""
     try:
@@ -22,13 +25,9 @@ async def test_websocket():
         # URL del WebSocket
         uri = "ws://localhost:8000/api/travels/test_travel_123/ws?token=test_token"
         
-        print(f"📡 Conectando a: {uri}")
-        
-        async with websockets.connect(uri) as websocket:
-            print("✅ WebSocket conectado exitosamente")
-            
-            # Enviar mensaje de prueba
-            test_message = {
+        # Mensajes de prueba
+        test_messages = [
+            {
                 "type": "message",
                 "data": {
                     "message": "Quiero ir a Tailandia por 7 días",
@@ -36,30 +35,30 @@ async def test_websocket():
                     "travel_id": "test_travel_123"
                 }
             }
-            
-            print(f"📤 Enviando mensaje: {json.dumps(test_message, indent=2)}")
-            await websocket.send(json.dumps(test_message))
-            
-            # Esperar respuesta
-            print("⏳ Esperando respuesta...")
-            response = await websocket.recv()
-            
-            print(f"📥 Respuesta recibida: {response}")
-            
-            # Parsear respuesta
+        ]
+        
+        # Recoger también los frames de progreso que lleguen en los 2 s siguientes
+        responses = await run_ws_tests(uri, test_messages, collect_window=2.0)
+        print(f"📥 Frames recibidos: {len(responses)}")
+        
+        # Parsear todas las respuestas de una pasada
+        parsed = []
+        for response in responses:
             try:
-                response_data = json.loads(response)
-                print(f"✅ Respuesta parseada: {json.dumps(response_data, indent=2)}")
-                
-                if response_data.get("type") == "message":
-                    message = response_data.get("data", {})
-                    print(f"📝 Mensaje del asistente: {message.get('message', '')[:100]}...")
-                    print(f"🎯 Intención: {message.get('intention', 'unknown')}")
-                else:
-                    print(f"⚠️ Tipo de respuesta inesperado: {response_data.get('type')}")
-                    
-            except json.JSONDecodeError as e:
+                parsed.append(orjson.loads(response))
+            except orjson.JSONDecodeError as e:
                 print(f"❌ Error parseando respuesta: {e}")
+                print(f"   Frame: {response}")
+        
+        for response_data in parsed:
+            print(f"✅ Respuesta parseada: {orjson.dumps(response_data, option=orjson.OPT_INDENT_2).decode()}")
+            
+            if response_data.get("type") == "message":
+                message = response_data.get("data", {})
+                print(f"📝 Mensaje del asistente: {message.get('message', '')[:100]}...")
+                print(f"🎯 Intención: {message.get('intention', 'unknown')}")
+            else:
+                print(f"⚠️ Tipo de respuesta inesperado: {response_data.get('type')}")
                 
     except websockets.exceptions.ConnectionClosed as e:
         print(f"❌ Conexión cerrada: {e}")
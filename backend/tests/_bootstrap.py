@@ -0,0 +1,18 @@
+"""
+Bootstrap común de los scripts de test: usa uvloop como event loop si está disponible
+y activa la caché de selección de destinos.
+"""
+
+import asyncio
+import os
+
+# Los tests repiten la misma selección (país, días, sitios); se importa antes que app.config
+os.environ.setdefault("DESTINATION_SELECTION_CACHE_TTL", str(6 * 3600))
+
+try:
+    import uvloop
+except ImportError:  # uvloop no existe en Windows; se mantiene el loop por defecto
+    uvloop = None
+
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
@@ -6,12 +6,13 @@ Test runner principal que ejecuta todos los tests.
 import asyncio
 import sys
 import os
-import subprocess
 from pathlib import Path
 
 # Agregar el directorio raíz al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from tests import _bootstrap  # noqa: F401
+
 async def run_all_tests():
     """Ejecuta todos los tests del proyecto."""
     try:
@@ -27,32 +28,41 @@ async def run_all_tests():
             "routers/test_travel_router.py"
         ]
         
-        results = []
-        
-        for test_file in test_files:
+        async def run_test_file(test_file):
+            """Ejecuta un test en su propio intérprete y devuelve (fichero, éxito, salida)."""
             test_path = tests_dir / test_file
-            if test_path.exists():
-                print(f"\n📋 Ejecutando: {test_file}")
-                try:
-                    # Ejecutar el test
-                    result = subprocess.run([
-                        sys.executable, str(test_path)
-                    ], capture_output=True, text=True, cwd=tests_dir.parent)
+            print(f"\n📋 Ejecutando: {test_file}")
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable, str(test_path),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=tests_dir.parent
+                )
+                stdout, stderr = await process.communicate()
+                
+                if process.returncode == 0:
+                    print(f"✅ {test_file} - PASÓ")
+                    return (test_file, True, stdout.decode(errors="replace"))
+                else:
+                    print(f"❌ {test_file} - FALLÓ")
+                    print(f"Error: {stderr.decode(errors='replace')}")
+                    return (test_file, False, stderr.decode(errors="replace"))
                     
-                    if result.returncode == 0:
-                        print(f"✅ {test_file} - PASÓ")
-                        results.append((test_file, True, result.stdout))
-                    else:
-                        print(f"❌ {test_file} - FALLÓ")
-                        print(f"Error: {result.stderr}")
-                        results.append((test_file, False, result.stderr))
-                        
-                except Exception as e:
-                    print(f"❌ {test_file} - ERROR: {e}")
-                    results.append((test_file, False, str(e)))
+            except Exception as e:
+                print(f"❌ {test_file} - ERROR: {e}")
+                return (test_file, False, str(e))
+        
+        existing_files = []
+        for test_file in test_files:
+            if (tests_dir / test_file).exists():
+                existing_files.append(test_file)
             else:
                 print(f"⚠️ {test_file} - NO ENCONTRADO")
         
+        # Los tests se lanzan en paralelo: arranques de intérprete y conexiones se solapan
+        results = await asyncio.gather(*[run_test_file(test_file) for test_file in existing_files])
+        
         # Resumen final
         print("\n" + "="*50)
         print("📊 RESUMEN DE TESTS")
@@ -8,6 +8,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
+from tests import _bootstrap  # noqa: F401
+
 from app.database import connect_to_mongodb
 from app.services.chat_service import chat_service
 
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Driver común para las pruebas de WebSocket.
+"""
+
+import asyncio
+import time
+import websockets
+import orjson
+
+async def run_ws_tests(uri, messages, collect_window=None):
+    """
+    Abre una única conexión WebSocket, envía todos los mensajes seguidos
+    y devuelve una respuesta (sin parsear) por cada mensaje enviado.
+    
+    Con collect_window (segundos) se recogen además los frames extra que el
+    servidor emita dentro de esa ventana (p. ej. actualizaciones de progreso).
+    """
+    print(f"📡 Conectando a: {uri}")
+    
+    # asyncio ya activa TCP_NODELAY en los sockets TCP que abre
+    async with websockets.connect(uri, max_queue=64) as websocket:
+        print("✅ Conexión WebSocket establecida")
+        
+        for message in messages:
+            print(f"📤 Enviando mensaje: {orjson.dumps(message, option=orjson.OPT_INDENT_2).decode()}")
+        # El servidor lee con receive_text, así que se envían frames de texto
+        await asyncio.gather(*[websocket.send(orjson.dumps(message).decode()) for message in messages])
+        
+        print("⏳ Esperando respuestas...")
+        frames = [await websocket.recv() for _ in messages]
+        
+        if collect_window:
+            end = time.monotonic() + collect_window
+            while (remaining := end - time.monotonic()) > 0:
+                try:
+                    frames.append(await asyncio.wait_for(websocket.recv(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+        
+        return frames
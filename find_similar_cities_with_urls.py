@@ -1,35 +1,62 @@
-from difflib import SequenceMatcher
 from itertools import combinations
-import json
 from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import orjson
+from rapidfuzz import fuzz, process
 
 def similarity(a, b):
     """Calcula la similitud entre dos strings (0-1)"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+    return fuzz.token_set_ratio(a.lower(), b.lower()) / 100
+
+class UnionFind:
+    """Conjuntos disjuntos con compresión de caminos y unión por tamaño"""
+    
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+    
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+    
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri == rj:
+            return
+        if self.size[ri] < self.size[rj]:
+            ri, rj = rj, ri
+        self.parent[rj] = ri
+        self.size[ri] += self.size[rj]
 
 def load_entities_from_jsonl(file_path):
     """Carga las entidades desde el archivo JSONL y las agrupa por tipo"""
     entidades_por_tipo = defaultdict(list)
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                data = json.loads(line)
-                url = data.get('url', 'URL desconocida')
-                source_name = data.get('source_name', 'Fuente desconocida')
+    # Lectura en bloque y parseo con orjson (splitlines ya elimina los saltos de línea)
+    for line in Path(file_path).read_bytes().splitlines():
+        if line.strip():
+            data = orjson.loads(line)
+            url = data.get('url', 'URL desconocida')
+            source_name = data.get('source_name', 'Fuente desconocida')
+            
+            # Agregar información de origen a cada entidad
+            for entidad in data.get('entities', []):
+                entidad['source_url'] = url
+                entidad['source_name'] = source_name
                 
-                # Agregar información de origen a cada entidad
-                for entidad in data.get('entities', []):
-                    entidad['source_url'] = url
-                    entidad['source_name'] = source_name
-                    
-                    tipo = entidad.get('entity_type', 'desconocido')
-                    if isinstance(tipo, list):
-                        tipo = tipo[0] if tipo else 'desconocido'
-                    elif tipo is None:
-                        tipo = 'desconocido'
-                    
-                    entidades_por_tipo[tipo].append(entidad)
+                tipo = entidad.get('entity_type', 'desconocido')
+                if isinstance(tipo, list):
+                    tipo = tipo[0] if tipo else 'desconocido'
+                elif tipo is None:
+                    tipo = 'desconocido'
+                
+                entidades_por_tipo[tipo].append(entidad)
     
     return entidades_por_tipo
 
@@ -41,63 +68,66 @@ def find_similar_cities_with_urls(entidades_por_tipo, threshold=0.7):
         print("No se encontraron ciudades")
         return
     
-    # Extraer nombres de ciudades con información de origen
-    ciudades_con_origen = []
+    # Extraer nombres de ciudades con información de origen en columnas paralelas
+    # (nombres contiguos para rapidfuzz; los grupos guardan solo índices)
+    nombres, urls, fuentes = [], [], []
     for ciudad in ciudades:
         nombre = ciudad.get('name') or ciudad.get('title') or ciudad.get('advice_text') or '[Sin nombre]'
         if nombre and nombre != '[Sin nombre]':
-            ciudades_con_origen.append({
-                'nombre': nombre,
-                'url': ciudad.get('source_url', 'URL desconocida'),
-                'source_name': ciudad.get('source_name', 'Fuente desconocida')
-            })
-    
-    # Encontrar grupos de ciudades similares
-    grupos_similares = []
-    ciudades_usadas = set()
-    
-    for i, ciudad1 in enumerate(ciudades_con_origen):
-        if ciudad1['nombre'] in ciudades_usadas:
+            nombres.append(nombre)
+            urls.append(ciudad.get('source_url', 'URL desconocida'))
+            fuentes.append(ciudad.get('source_name', 'Fuente desconocida'))
+    
+    # Encontrar grupos de ciudades similares. Blocking: solo se comparan nombres con la
+    # misma inicial, sin restringir la longitud (token_set_ratio da 100 a "Bangkok" y
+    # "Bangkok City"); cada bloque se puntúa en C con rapidfuzz y los pares se unen
+    # en el union-find
+    nombres_lower = [nombre.lower() for nombre in nombres]
+    bloques = defaultdict(list)
+    for i, nombre in enumerate(nombres_lower):
+        bloques[nombre[:1]].append(i)
+    
+    conjuntos = UnionFind(len(nombres))
+    for indices in bloques.values():
+        if len(indices) < 2:
             continue
-            
-        grupo = [ciudad1]
-        ciudades_usadas.add(ciudad1['nombre'])
-        
-        # Buscar ciudades similares
-        for ciudad2 in ciudades_con_origen[i+1:]:
-            if ciudad2['nombre'] not in ciudades_usadas:
-                sim = similarity(ciudad1['nombre'], ciudad2['nombre'])
-                if sim >= threshold:
-                    grupo.append(ciudad2)
-                    ciudades_usadas.add(ciudad2['nombre'])
-        
-        if len(grupo) > 1:  # Solo grupos con más de una ciudad
-            grupos_similares.append(grupo)
+        bloque = [nombres_lower[i] for i in indices]
+        matriz = process.cdist(bloque, bloque, scorer=fuzz.token_set_ratio, score_cutoff=threshold * 100,
+                               workers=-1, dtype=np.uint8)
+        for a, b in zip(*np.triu(matriz, k=1).nonzero()):
+            conjuntos.union(indices[a], indices[b])
+    
+    # Una sola pasada construye los grupos; los de tamaño 1 son las ciudades únicas
+    grupos = defaultdict(list)
+    for i in range(len(nombres)):
+        grupos[conjuntos.find(i)].append(i)
+    
+    grupos_similares = [grupo for grupo in grupos.values() if len(grupo) > 1]  # Solo grupos con más de una ciudad
     
     # Mostrar resultados ordenados alfabéticamente
     print(f"=== CIUDADES SIMILARES (similitud >= {threshold}) ===")
-    print(f"Total de ciudades: {len(ciudades_con_origen)}")
+    print(f"Total de ciudades: {len(nombres)}")
     print(f"Grupos de ciudades similares: {len(grupos_similares)}")
     
     # Mostrar grupos ordenados alfabéticamente
-    for grupo in sorted(grupos_similares, key=lambda x: x[0]['nombre'].lower()):
-        print(f"\n📍 {grupo[0]['nombre']} (principal):")
-        for ciudad in grupo[1:]:
-            sim = similarity(grupo[0]['nombre'], ciudad['nombre'])
-            print(f"   └─ {ciudad['nombre']} (similitud: {sim:.2f})")
-            print(f"      📍 URL: {ciudad['url']}")
-            print(f"      📰 Fuente: {ciudad['source_name']}")
+    for grupo in sorted(grupos_similares, key=lambda x: nombres_lower[x[0]]):
+        principal = grupo[0]
+        print(f"\n📍 {nombres[principal]} (principal):")
+        for i in grupo[1:]:
+            sim = similarity(nombres[principal], nombres[i])
+            print(f"   └─ {nombres[i]} (similitud: {sim:.2f})")
+            print(f"      📍 URL: {urls[i]}")
+            print(f"      📰 Fuente: {fuentes[i]}")
     
     # Mostrar ciudades únicas (sin similares)
-    ciudades_unicas = [c for c in ciudades_con_origen if c['nombre'] not in ciudades_usadas or 
-                      not any(c['nombre'] in [ciudad['nombre'] for ciudad in grupo] for grupo in grupos_similares if len(grupo) > 1)]
+    ciudades_unicas = [grupo[0] for grupo in grupos.values() if len(grupo) == 1]
     
     if ciudades_unicas:
         print(f"\n🏙️  CIUDADES ÚNICAS ({len(ciudades_unicas)}):")
-        for ciudad in sorted(ciudades_unicas, key=lambda x: x['nombre'].lower()):
-            print(f"   • {ciudad['nombre']}")
-            print(f"     📍 URL: {ciudad['url']}")
-            print(f"     📰 Fuente: {ciudad['source_name']}")
+        for i in sorted(ciudades_unicas, key=lambda i: nombres_lower[i]):
+            print(f"   • {nombres[i]}")
+            print(f"     📍 URL: {urls[i]}")
+            print(f"     📰 Fuente: {fuentes[i]}")
 
 # Ejemplo de uso
 if __name__ == "__main__":
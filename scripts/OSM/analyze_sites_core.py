@@ -0,0 +1,104 @@
+"""
+Núcleo de agregación de analyze_sites: acumula cada sitio en los contadores.
+
+Está escrito en Python tipado compatible con mypyc, de modo que el bucle por
+sitio puede compilarse a una extensión C sin cambiar el código:
+
+    cd scripts/OSM && mypyc analyze_sites_core.py
+
+Si la extensión compilada existe, analyze_sites la importa en lugar de este
+fichero; si no, se usa tal cual en Python puro.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+# Campos de useful_tags cuya presencia se cuenta en "Información adicional"
+INFO_FIELDS = frozenset(("name", "website", "phone", "opening_hours", "wikidata"))
+
+# Tags de interés con un contador de valores cada uno
+TAG_KEYS = ("tourism", "amenity", "historic", "leisure", "natural", "man_made", "shop")
+
+
+class SiteStats:
+    """Contadores del análisis; los valores se acumulan en listas y se vuelcan con flush()."""
+
+    def __init__(self) -> None:
+        self.total: int = 0
+        self.osm_types: Counter[Any] = Counter()
+        self.countries: Counter[Any] = Counter()
+        self.cities: Counter[Any] = Counter()
+        self.tag_counters: Dict[str, Counter[Any]] = {k: Counter() for k in TAG_KEYS}
+
+        # Valores pendientes de volcar: Counter.update cuenta la lista en C
+        self.pending_tags: Dict[str, List[Any]] = {k: [] for k in TAG_KEYS}
+        self.pending_types: List[Any] = []
+        self.pending_countries: List[Any] = []
+        self.pending_cities: List[Any] = []
+
+        self.sites_with: Counter[str] = Counter({
+            "name": 0,
+            "website": 0,
+            "phone": 0,
+            "opening_hours": 0,
+            "wikidata": 0,
+            "location": 0,
+        })
+
+        self.examples: Dict[str, List[Tuple[Any, Any]]] = {
+            "hotels": [],
+            "museums": [],
+            "restaurants": [],
+        }
+
+    def tally(self, site: Any) -> None:
+        """Acumula un sitio leyendo sólo las claves necesarias.
+
+        `site` puede ser un dict o un objeto perezoso de simdjson; no se guarda
+        ninguna referencia a él.
+        """
+        self.total += 1
+        self.pending_types.append(site.get("osm_type"))
+
+        tags: Any = site.get("useful_tags", {})
+        # País y ciudad
+        c = tags.get("addr:country")
+        if c: self.pending_countries.append(c)
+        city = tags.get("addr:city")
+        if city: self.pending_cities.append(city)
+
+        # Tags de interés: una sola pasada por los tags del sitio
+        pending_tags = self.pending_tags
+        for k, v in tags.items():
+            values = pending_tags.get(k)
+            if values is not None:
+                values.append(v)
+
+        # Información adicional
+        self.sites_with.update(INFO_FIELDS.intersection(tags))
+        if site.get("location"):
+            self.sites_with["location"] += 1
+
+        # Ejemplos
+        examples = self.examples
+        if tags.get("tourism") == "hotel" and len(examples["hotels"]) < 3:
+            examples["hotels"].append((tags.get("name","?"),
+                                       tags.get("website", "?")))
+        if tags.get("tourism") == "museum" and len(examples["museums"]) < 3:
+            examples["museums"].append((tags.get("name","?"),
+                                        tags.get("wikidata", "?")))
+        if tags.get("amenity") == "restaurant" and len(examples["restaurants"]) < 3:
+            examples["restaurants"].append((tags.get("name","?"),
+                                            tags.get("opening_hours", "?")))
+
+    def flush(self) -> None:
+        """Vuelca los valores pendientes a sus Counter."""
+        for k, values in self.pending_tags.items():
+            self.tag_counters[k].update(values)
+            values.clear()
+        self.osm_types.update(self.pending_types)
+        self.pending_types.clear()
+        self.countries.update(self.pending_countries)
+        self.pending_countries.clear()
+        self.cities.update(self.pending_cities)
+        self.pending_cities.clear()
@@ -6,6 +6,9 @@ con capacidad de reanudar a partir del último progreso guardado.
 
 import osmium
 import json
+import orjson
+import shutil
+from multiprocessing import Pool
 from pathlib import Path
 
 # Configuración de rutas
@@ -29,71 +32,138 @@ USEFUL_TAGS = {
     "addr:country", "addr:postcode"
 }
 SAVE_EVERY = 100_000  # Guarda progreso cada 100k elementos
+# Un worker por tipo de entidad; el orden es el del fichero final
+ENTITY_SHARDS = {
+    "node": osmium.osm.osm_entity_bits.NODE,
+    "way": osmium.osm.osm_entity_bits.WAY,
+    "relation": osmium.osm.osm_entity_bits.RELATION,
+}
+
+class TourismHandler:
+    """Convierte los objetos OSM ya filtrados por KeyFilter en registros JSONL."""
 
-class TourismHandler(osmium.SimpleHandler):
-    def __init__(self, resume_count, total_estimated):
-        super().__init__()
-        self.processed_count = resume_count
+    def __init__(self, resume_count, output_file=OUTPUT_FILE, progress_file=PROGRESS_FILE):
+        # Se cuenta desde cero: los primeros resume_count objetos se saltan en _accept
+        self.processed_count = 0
         self.interesting_count = 0
         self.resume_count = resume_count
-        self.total_estimated = total_estimated
+        self.output_file = output_file
+        self.progress_file = progress_file
         self.buffer = []
 
     def save_progress(self):
         data = {
-            "processed_count": self.processed_count,
+            # Cuenta sólo los objetos que superan el KeyFilter
+            "filtered_count": self.processed_count,
             "interesting_count": self.interesting_count,
-            "output_file_size": OUTPUT_FILE.stat().st_size if OUTPUT_FILE.exists() else 0
+            "output_file_size": self.output_file.stat().st_size if self.output_file.exists() else 0
         }
-        with open(PROGRESS_FILE, "w", encoding="utf-8") as f:
+        with open(self.progress_file, "w", encoding="utf-8") as f:
             json.dump(data, f)
 
     def flush_buffer(self):
         if not self.buffer:
             return
-        with open(OUTPUT_FILE, "a", encoding="utf-8") as f:
-            for item in self.buffer:
-                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        # orjson ya emite UTF-8; un único write por lote
+        with open(self.output_file, "ab") as f:
+            f.write(b"".join(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE) for item in self.buffer))
         print(f"💾 Guardados {len(self.buffer):,} sitios relevantes")
         self.buffer.clear()
         self.save_progress()
 
-    def process(self, obj, obj_type):
+    # Formatos de _id precalculados por tipo de entidad
+    NODE_ID = "osm_node_%d"
+    WAY_ID = "osm_way_%d"
+    RELATION_ID = "osm_relation_%d"
+
+    def _accept(self):
+        """Cuenta el objeto y dice si hay que procesarlo (False mientras se reanuda)."""
         self.processed_count += 1
         if self.processed_count <= self.resume_count:
-            return
+            return False
         if self.processed_count % SAVE_EVERY == 0:
-            pct = (self.processed_count / self.total_estimated) * 100
-            print(f"Procesados {self.processed_count:,} (~{pct:.2f}%)")
-
-        tags = dict(obj.tags)
-        if any(k in tags for k in INTERESTING_KEYS):
-            self.interesting_count += 1
-            record = {
-                "_id": f"osm_{obj_type}_{obj.id}",
-                "osm_type": obj_type,
-                "osm_id": obj.id,
-                "useful_tags": {},
-                "other_tags": {}
-            }
-            if obj_type == "node":
-                record["location"] = {"lat": obj.location.lat, "lon": obj.location.lon}
-            else:
-                record["location"] = {}
-            for k, v in tags.items():
-                (record["useful_tags"] if k in USEFUL_TAGS else record["other_tags"]).setdefault(k, v)
-            self.buffer.append(record)
-            if len(self.buffer) >= SAVE_EVERY:
-                self.flush_buffer()
-
-    def node(self, n): self.process(n, "node")
-    def way(self, w): self.process(w, "way")
-    def relation(self, r): self.process(r, "relation")
-
-
-def estimate_total(file_bytes):
-    avg = 200
-    return max(1, file_bytes // avg)
+            print(f"Procesados {self.processed_count:,} elementos con tags de interés")
+        return True
+
+    def _record_common(self, obj, obj_type, id_format, location):
+        # KeyFilter ya garantiza que el objeto tiene alguna de INTERESTING_KEYS.
+        # Las claves de un objeto OSM son únicas: se reparten directamente sin copiar
+        # antes los tags a un dict intermedio
+        self.interesting_count += 1
+        useful_tags = {}
+        other_tags = {}
+        useful = USEFUL_TAGS
+        for k, v in obj.tags:
+            (useful_tags if k in useful else other_tags)[k] = v
+        osm_id = obj.id
+        record = {
+            "_id": id_format % osm_id,
+            "osm_type": obj_type,
+            "osm_id": osm_id,
+            "useful_tags": useful_tags,
+            "other_tags": other_tags,
+            "location": location
+        }
+        self.buffer.append(record)
+        if len(self.buffer) >= SAVE_EVERY:
+            self.flush_buffer()
+
+    # Los objetos ya procesados al reanudar se descartan antes de tocar
+    # ubicación o tags
+    def node(self, n):
+        if self._accept():
+            loc = n.location
+            self._record_common(n, "node", self.NODE_ID, {"lat": loc.lat, "lon": loc.lon})
+
+    def way(self, w):
+        if self._accept():
+            self._record_common(w, "way", self.WAY_ID, {})
+
+    def relation(self, r):
+        if self._accept():
+            self._record_common(r, "relation", self.RELATION_ID, {})
+
+def shard_path(path, obj_type):
+    """Ruta del fichero parcial de un tipo de entidad: sites_filtered.part_node.jsonl"""
+    return path.with_name(f"{path.stem}.part_{obj_type}{path.suffix}")
+
+
+def process_shard(obj_type):
+    """Worker: recorre el PBF leyendo sólo un tipo de entidad y escribe su parte."""
+    output_file = shard_path(OUTPUT_FILE, obj_type)
+    progress_file = shard_path(PROGRESS_FILE, obj_type)
+
+    resume = 0
+    if progress_file.exists():
+        with open(progress_file, "r", encoding="utf-8") as f:
+            resume = json.load(f).get("filtered_count", 0)
+        print(f"🔄 [{obj_type}] Reanudando desde {resume:,} elementos filtrados")
+
+    handler = TourismHandler(resume_count=resume, output_file=output_file, progress_file=progress_file)
+    handle = getattr(handler, obj_type)
+
+    # El KeyFilter descarta en C++ los objetos sin tags de interés (la gran mayoría
+    # de nodos del planeta), así que Python sólo ve los candidatos
+    processor = osmium.FileProcessor(str(OSM_FILE), ENTITY_SHARDS[obj_type]) \
+        .with_filter(osmium.filter.KeyFilter(*INTERESTING_KEYS))
+    for obj in processor:
+        handle(obj)
+
+    handler.flush_buffer()
+    return obj_type, handler.processed_count, handler.interesting_count
+
+
+def merge_shards():
+    """Concatena las partes en OUTPUT_FILE (nodos, vías, relaciones) y las elimina."""
+    with open(OUTPUT_FILE, "wb") as out:
+        for obj_type in ENTITY_SHARDS:
+            part = shard_path(OUTPUT_FILE, obj_type)
+            if part.exists():
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out, 16 * 1024 * 1024)
+    for obj_type in ENTITY_SHARDS:
+        shard_path(OUTPUT_FILE, obj_type).unlink(missing_ok=True)
+        shard_path(PROGRESS_FILE, obj_type).unlink(missing_ok=True)
 
 
 def main():
@@ -102,32 +172,30 @@ def main():
         print("❌ Archivo OSM no encontrado.")
         return
     size = OSM_FILE.stat().st_size
-    total_est = estimate_total(size)
     print(f"📦 Tamaño: {size / (1024**3):.2f} GB")
-    print(f"📊 Estimado ~{total_est:,} elementos")
 
-    resume = 0
     if PROGRESS_FILE.exists():
-        with open(PROGRESS_FILE, "r", encoding="utf-8") as f:
-            resume = json.load(f).get("processed_count", 0)
-        print(f"🔄 Reanudando desde {resume:,} elementos")
-    else:
-        print("▶️ Comenzando desde cero")
-
-    handler = TourismHandler(resume_count=resume, total_estimated=total_est)
-
-    reader = osmium.io.Reader(
-        str(OSM_FILE),
-        osmium.osm.osm_entity_bits.NODE |
-        osmium.osm.osm_entity_bits.WAY |
-        osmium.osm.osm_entity_bits.RELATION
-    )
-    print("🚀 Iniciando procesamiento...")
-    osmium.apply(reader, handler)
-    reader.close()
-
-    handler.flush_buffer()
-    print(f"\n✅ Completado. Procesados: {handler.processed_count:,}, Relevantes: {handler.interesting_count:,}")
+        # El progreso ahora se guarda por tipo de entidad (progress.part_*.json); el
+        # antiguo no se puede traducir, así que ese punto de reanudación se pierde
+        print("⚠️ Progreso en formato antiguo descartado: el filtrado empieza desde el principio "
+              "y la salida previa se sobrescribirá")
+        PROGRESS_FILE.unlink()
+
+    # Nodos, vías y relaciones se filtran en paralelo, cada uno en su proceso. Cada
+    # proceso lee y descomprime el PBF completo y sólo se ahorra el parseo de los
+    # otros tipos; como los nodos dominan, el tiempo total es aproximadamente el de
+    # la pasada de nodos: la mejora frente a una sola pasada es modesta
+    print(f"🚀 Iniciando procesamiento con {len(ENTITY_SHARDS)} procesos...")
+    processed = interesting = 0
+    with Pool(len(ENTITY_SHARDS)) as pool:
+        for obj_type, shard_processed, shard_interesting in pool.imap_unordered(process_shard, ENTITY_SHARDS):
+            print(f"✔️ [{obj_type}] Procesados: {shard_processed:,}, Relevantes: {shard_interesting:,}")
+            processed += shard_processed
+            interesting += shard_interesting
+
+    print("🔗 Uniendo resultados parciales...")
+    merge_shards()
+    print(f"\n✅ Completado. Procesados: {processed:,}, Relevantes: {interesting:,}")
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,4 @@
-import json
+import orjson
 import asyncio
 import sys
 from pathlib import Path
@@ -12,6 +12,7 @@ from app.config import settings
 
 # Configuración de rutas
 ENRICHED_FILE = Path(__file__).parent.parent / "scripts" / "data" / "scraper_enrichment" / "enriched_data_9.jsonl"
+BATCH_SIZE = 10_000  # Documentos por insert_many
 
 async def load_enriched_sites_to_mongodb():
     """Carga los sitios enriquecidos desde el JSONL a MongoDB en la colección 'sites'."""
@@ -28,27 +29,29 @@ async def load_enriched_sites_to_mongodb():
         # Obtener la colección de sitios
         sites_collection = await get_sites_collection()
         
-        # Leer el archivo JSONL
-        print(f"Leyendo archivo: {ENRICHED_FILE}")
-        sites_data = []
-        
-        with open(ENRICHED_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    site = json.loads(line)
-                    sites_data.append(site)
-        
-        print(f"Se encontraron {len(sites_data)} sitios para cargar")
-        
         # Limpiar la colección existente (opcional)
         print("Limpiando colección existente...")
         await sites_collection.delete_many({})
         
-        # Insertar los datos
-        print("Insertando sitios en MongoDB...")
-        if sites_data:
-            result = await sites_collection.insert_many(sites_data)
-            print(f"Se insertaron {len(result.inserted_ids)} sitios exitosamente")
+        # Leer el archivo JSONL e insertar por lotes: la memoria queda acotada al
+        # tamaño de un lote
+        print(f"Leyendo e insertando sitios desde: {ENRICHED_FILE}")
+        total = 0
+        batch = []
+        
+        with open(ENRICHED_FILE, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    batch.append(orjson.loads(line))
+                if len(batch) >= BATCH_SIZE:
+                    result = await sites_collection.insert_many(batch, ordered=False)
+                    total += len(result.inserted_ids)
+                    batch = []
+        
+        if batch:
+            result = await sites_collection.insert_many(batch, ordered=False)
+            total += len(result.inserted_ids)
+        print(f"Se insertaron {total} sitios exitosamente")
         
         print("¡Carga completada exitosamente!")
         
@@ -4,28 +4,33 @@ Script principal para procesar datos de OpenStreetMap y extraer sitios turístic
 Este script ejecuta todo el flujo de trabajo: filtrado y análisis.
 """
 
-import subprocess
+import sys
 import time
 from pathlib import Path
 
-def run_command(command, description):
-    """Ejecuta un comando y muestra el progreso."""
+# Los pasos se importan como módulos y se ejecutan en este mismo proceso
+sys.path.insert(0, str(Path(__file__).parent))
+
+import filter_osm_sites
+import analyze_sites
+
+def run_step(step, description, *args):
+    """Ejecuta un paso (función, con sus argumentos) y muestra el progreso."""
     print(f"\n{'='*60}")
     print(f"🚀 {description}")
-    print(f"📝 Comando: {command}")
+    print(f"📝 Paso: {step.__module__}.{step.__name__}()")
     print(f"{'='*60}")
     
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     try:
-        subprocess.run(command, shell=True, check=True, 
-                       capture_output=False, text=True)
+        step(*args)
         
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
         print(f"\n✅ {description} completado en {duration:.2f} segundos")
         return True
         
-    except subprocess.CalledProcessError as e:
+    except Exception as e:
         print(f"\n❌ Error ejecutando {description}: {e}")
         return False
 
@@ -65,15 +70,15 @@ def main():
 
     # Paso 1: Filtrado de sitios turísticos
     print(f"\n📋 PASO 1: FILTRADO DE SITIOS TURÍSTICOS")
-    output_file = data_dir / "sites_filtered.jsonl"
+    output_file = filter_osm_sites.OUTPUT_FILE
     
     if output_file.exists() and output_file.stat().st_size > 100 * 1024 * 1024:
         print(f"🟡 Archivo de salida ya existe: {output_file}")
         print(f"📏 Tamaño: {output_file.stat().st_size / (1024**2):.2f} MB")
         print("✅ Saltando paso de filtrado")
     else:
-        success = run_command(
-            "python filter_osm_sites.py",
+        success = run_step(
+            filter_osm_sites.main,
             "Filtrado de sitios turísticos desde OSM"
         )
         if not success or not output_file.exists():
@@ -82,9 +87,10 @@ def main():
 
     # Paso 2: Análisis
     print(f"\n📋 PASO 2: ANÁLISIS DE RESULTADOS")
-    success = run_command(
-        f"python {script_dir / 'analyze_sites.py'}",
-        "Análisis de sitios filtrados"
+    success = run_step(
+        analyze_sites.main,
+        "Análisis de sitios filtrados",
+        output_file
     )
 
     
@@ -25,12 +25,19 @@ def download_cities_data():
             # Read the txt file directly from the zip
             with zip_ref.open('cities5000.txt') as file:
                 # GeoNames format is tab-separated
+                # Only the columns we keep are parsed, straight into typed arrays
                 df = pd.read_csv(file, sep='\t', header=None, 
                                names=['geonameid', 'name', 'asciiname', 'alternatenames',
                                     'latitude', 'longitude', 'feature_class', 'feature_code',
                                     'country_code', 'cc2', 'admin1_code', 'admin2_code',
                                     'admin3_code', 'admin4_code', 'population', 'elevation',
-                                    'dem', 'timezone', 'modification_date'])
+                                    'dem', 'timezone', 'modification_date'],
+                               usecols=['name', 'latitude', 'longitude', 'country_code',
+                                        'admin1_code', 'population', 'timezone'],
+                               dtype={'name': 'string', 'latitude': 'float64', 'longitude': 'float64',
+                                      'country_code': 'string', 'admin1_code': 'string',
+                                      'population': 'Int64', 'timezone': 'string'},
+                               keep_default_na=False, na_values=[''])
         
         # Process the data
         print("Processing data...")
@@ -49,9 +56,9 @@ def download_cities_data():
         columns = ["name", "country", "latitude", "longitude", "timezone", "population", "region"]
         df = df[columns]
         
-        # Save processed data
-        processed_file = data_dir / "cities.csv"
-        df.to_csv(processed_file, index=False)
+        # Save processed data as Parquet: typed columns, no text re-parsing on load
+        processed_file = data_dir / "cities.parquet"
+        df.to_parquet(processed_file, index=False)
         
         print(f"Data downloaded and processed successfully. Saved to {processed_file}")
         print(f"Total cities processed: {len(df)}")
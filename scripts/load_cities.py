@@ -1,4 +1,5 @@
 import pandas as pd
+import pyarrow.parquet as pq
 import os
 from pathlib import Path
 import sys
@@ -11,6 +12,18 @@ sys.path.append(str(Path(__file__).parent.parent / "backend"))
 
 from app.config.settings import settings
 
+# Columnas de cities.parquet con su tipo
+CITY_DTYPES = {
+    "name": "string",
+    "country": "string",
+    "latitude": "float64",
+    "longitude": "float64",
+    "timezone": "string",
+    "population": "Int64",
+    "region": "string",
+}
+CHUNK_SIZE = 50_000  # Filas por lectura e insert_many
+
 async def load_cities_to_mongodb():
     # Conectar a MongoDB
     client = AsyncIOMotorClient(settings.MONGODB_URL)
@@ -18,35 +31,27 @@ async def load_cities_to_mongodb():
     cities_collection = db.cities
     
     try:
-        # Read the CSV file using absolute path
-        csv_path = Path(__file__).parent / "data" / "cities.csv"
-        if not csv_path.exists():
-            print(f"Cities CSV file not found at {csv_path}. Please run download_cities.py first.")
+        # Read the Parquet file using absolute path
+        parquet_path = Path(__file__).parent / "data" / "cities.parquet"
+        if not parquet_path.exists():
+            print(f"Cities Parquet file not found at {parquet_path}. Please run download_cities.py first.")
             return
         
-        df = pd.read_csv(csv_path)
-        
-        # Preparar los documentos para MongoDB
-        cities = []
-        for _, row in df.iterrows():
-            city = {
-                "name": row['name'],
-                "country": row['country'],
-                "country_code": row['country_code'] if 'country_code' in row else None,
-                "latitude": float(row['latitude']),
-                "longitude": float(row['longitude']),
-                "timezone": row['timezone'],
-                "population": int(row['population']) if pd.notna(row['population']) else None,
-                "region": row['region'],
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            cities.append(city)
+        # Leer e insertar por bloques: cada bloque pasa a documentos sin iterrows
+        now = datetime.utcnow()
+        loaded = 0
+        for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=CHUNK_SIZE, columns=list(CITY_DTYPES)):
+            chunk = batch.to_pandas().astype(CITY_DTYPES)
+            # object + where: Mongo recibe int/float/str nativos y None en lugar de NA
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            cities = chunk.assign(country_code=None, created_at=now, updated_at=now).to_dict(orient='records')
+            if cities:
+                await cities_collection.insert_many(cities, ordered=False)
+                loaded += len(cities)
         
-        # Insertar en MongoDB
-        if cities:
-            await cities_collection.insert_many(cities)
-            print(f"Loaded {len(cities)} cities into MongoDB")
+        # Resumen de la carga
+        if loaded:
+            print(f"Loaded {loaded} cities into MongoDB")
             
             # Verificar la carga
             count = await cities_collection.count_documents({})
@@ -1,6 +1,12 @@
 import json
+import sys
+from pathlib import Path
 from pymongo import MongoClient
 
+# Añadir la carpeta 'backend' al sys.path para compartir el nombre del índice con el backend
+sys.path.append(str(Path(__file__).resolve().parents[1] / "backend"))
+from app.database import SITES_ENTITY_SUBTYPE_INDEX
+
 MONGO_URL = "mongodb://localhost:27017"
 DB_NAME = "travel_app"
 COLLECTION = "sites"
@@ -38,6 +44,9 @@ def load_enriched_sites():
             result = collection.insert_many(docs)
             print(f"Se insertaron {len(result.inserted_ids)} sitios exitosamente")
         
+        # Índice compuesto para los filtros {"entity_type", "subtype"} del backend
+        collection.create_index([("entity_type", 1), ("subtype", 1)], name=SITES_ENTITY_SUBTYPE_INDEX)
+        
         print("¡Carga completada exitosamente!")
         
     except Exception as e:
@@ -197,6 +197,17 @@ NORMALIZED_ENTITIES = {
 }
 
 
+# Tablas precalculadas a partir de NORMALIZED_ENTITIES (una vez, al importar)
+# variación en minúsculas -> nombre normalizado; si una variación aparece en
+# varias entradas gana la primera, como en la búsqueda lineal original
+_VARIATION_TO_CANONICAL = {}
+for _normalized_name, _variations in NORMALIZED_ENTITIES.items():
+    for _variation in _variations:
+        _VARIATION_TO_CANONICAL.setdefault(_variation.lower(), _normalized_name)
+_ALL_VARIATIONS = tuple(v for variations in NORMALIZED_ENTITIES.values() for v in variations)
+del _normalized_name, _variations, _variation
+
+
 def normalize_entity(entity_name):
     """
     Normaliza el nombre de una ciudad usando el diccionario.
@@ -211,12 +222,7 @@ def normalize_entity(entity_name):
         return entity_name
     
     entity_name = entity_name.strip()
-    
-    for normalized_name, variations in NORMALIZED_ENTITIES.items():
-        if entity_name.lower() in [v.lower() for v in variations]:
-            return normalized_name
-    
-    return entity_name
+    return _VARIATION_TO_CANONICAL.get(entity_name.lower(), entity_name)
 
 def get_all_variations():
     """
@@ -225,10 +231,27 @@ def get_all_variations():
     Returns:
         list: Lista de todas las variaciones
     """
-    all_variations = []
-    for variations in NORMALIZED_ENTITIES.values():
-        all_variations.extend(variations)
-    return all_variations
+    return list(_ALL_VARIATIONS)
+
+_VARIATION_TRIE = None
+
+def entities_with_prefix(prefix):
+    """
+    Variaciones (en minúsculas) que empiezan por el prefijo dado.
+    
+    Args:
+        prefix (str): Prefijo a buscar (sin distinguir mayúsculas)
+        
+    Returns:
+        list: Variaciones que empiezan por el prefijo
+    """
+    global _VARIATION_TRIE
+    if _VARIATION_TRIE is None:
+        # Trie compacto (marisa, en C++) sobre todas las variaciones; se construye
+        # en la primera consulta
+        import marisa_trie
+        _VARIATION_TRIE = marisa_trie.Trie(_VARIATION_TO_CANONICAL)
+    return _VARIATION_TRIE.keys(prefix.lower())
 
 def get_entity_info(entity_name):
     """
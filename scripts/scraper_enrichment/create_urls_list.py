@@ -1,6 +1,7 @@
-import requests
-import json
+import httpx
 import os
+import sqlite3
+import orjson
 from dotenv import load_dotenv
 
 # Cargar variables de entorno desde .env
@@ -11,23 +12,34 @@ SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 if not SERPAPI_KEY:
     raise ValueError("SERPAPI_KEY no encontrada en el archivo .env")
 
+URLS_FILE = "urls_list.jsonl"
+# Índice de URLs ya vistas (clave primaria url); el JSONL sigue siendo el registro completo
+SEEN_DB = "urls_seen.db"
+
 search_queries = [
     "qué ver en Tailandia",
     "guía de viaje Tailandia"]
 
-def load_existing_urls():
-    existing_urls = set()
-    try:
-        with open("urls_list.jsonl", "r", encoding="utf-8") as f:
-            for line in f:
-                data = json.loads(line.strip())
-                if "url" in data:
-                    existing_urls.add(data["url"])
-    except FileNotFoundError:
-        pass
-    return existing_urls
-
-def buscar_urls(query):
+def open_seen_db():
+    """Abre el índice de URLs vistas; si es nuevo, lo rellena una vez desde el JSONL."""
+    conn = sqlite3.connect(SEEN_DB)
+    conn.execute("CREATE TABLE IF NOT EXISTS seen(url TEXT PRIMARY KEY)")
+    if conn.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is None:
+        try:
+            with open(URLS_FILE, "rb") as f:
+                urls = []
+                for line in f:
+                    if line.strip():
+                        data = orjson.loads(line)
+                        if "url" in data:
+                            urls.append((data["url"],))
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO seen(url) VALUES (?)", urls)
+        except FileNotFoundError:
+            pass
+    return conn
+
+def buscar_urls(query, session):
     params = {
         "engine": "google",
         "q": query,
@@ -35,23 +47,28 @@ def buscar_urls(query):
         "num": 25,
         "api_key": SERPAPI_KEY
     }
-    r = requests.get("https://serpapi.com/search", params=params)
+    r = session.get("https://serpapi.com/search", params=params)
     resultados = r.json()
     urls = [item["link"] for item in resultados.get("organic_results", [])]
     return urls
 
-# Cargar URLs existentes
-existing_urls = load_existing_urls()
-print(f"URLs existentes: {len(existing_urls)}")
+# Cargar el índice de URLs existentes
+seen_db = open_seen_db()
+print(f"URLs existentes: {seen_db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]}")
 
-# Buscar y añadir nuevas URLs
-with open("urls_list.jsonl", "a", encoding="utf-8") as f:
+# Buscar y añadir nuevas URLs (una sesión HTTP y una transacción por consulta)
+with httpx.Client(http2=True, timeout=20.0) as session, open(URLS_FILE, "ab") as f:
     for query in search_queries:
-        urls = buscar_urls(query)
-        for url in urls:
-            if url not in existing_urls:
-                f.write(json.dumps({"query": query, "url": url}) + "\n")
-                existing_urls.add(url)
-                print(f"Añadida: {url}")
-
-print("¡Listo!") 
\ No newline at end of file
+        urls = buscar_urls(query, session)
+        # Si una consulta posterior falla, lo ya escrito en el JSONL queda
+        # también confirmado en el índice y no se duplica en la siguiente ejecución
+        with seen_db:
+            for url in urls:
+                # INSERT OR IGNORE sólo inserta (rowcount 1) si la URL no estaba
+                if seen_db.execute("INSERT OR IGNORE INTO seen(url) VALUES (?)", (url,)).rowcount:
+                    f.write(orjson.dumps({"query": query, "url": url}, option=orjson.OPT_APPEND_NEWLINE))
+                    print(f"Añadida: {url}")
+            f.flush()
+seen_db.close()
+
+print("¡Listo!")
@@ -1,13 +1,54 @@
 # download_page.py
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 
-def download_and_clean(url):
-    resp = requests.get(url, timeout=20)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, 'html.parser')
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+
+HEADERS = {"user-agent": "Mozilla/5.0 (compatible; TravelApp-scraper/1.0)"}
+LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+# Reintentos de una descarga ante errores de red o respuestas transitorias
+MAX_DOWNLOAD_ATTEMPTS = 3
+RETRY_STATUS = frozenset((429, 500, 502, 503, 504))
+
+def clean_html(html):
+    # Parser lexbor (C) en lugar de html.parser de BeautifulSoup
+    tree = LexborHTMLParser(html)
     # Elimina scripts y estilos
-    for tag in soup(['script', 'style', 'noscript']):
+    for tag in tree.css('script, style, noscript'):
         tag.decompose()
-    text = soup.get_text(separator=' ', strip=True)
-    return text 
\ No newline at end of file
+    if tree.root is None:
+        return ''
+    text = tree.root.text(separator=' ', strip=True)
+    return text
+
+def async_client():
+    """Cliente asíncrono (HTTP/2, keep-alive) para compartir entre muchas descargas."""
+    return httpx.AsyncClient(http2=True, timeout=20.0, headers=HEADERS,
+                             limits=LIMITS, follow_redirects=True)
+
+async def download_html_conditional(client, url, etag=None, last_modified=None):
+    """GET condicional con los validadores guardados de una descarga anterior.
+
+    Devuelve (html, etag, last_modified); html es None si el servidor responde
+    304 Not Modified, es decir, la página no ha cambiado y no se descarga el cuerpo.
+    """
+    headers = {}
+    if etag:
+        headers["if-none-match"] = etag
+    if last_modified:
+        headers["if-modified-since"] = last_modified
+    for attempt in range(MAX_DOWNLOAD_ATTEMPTS):
+        try:
+            resp = await client.get(url, headers=headers)
+            if resp.status_code not in RETRY_STATUS:
+                break
+            resp.raise_for_status()
+        except (httpx.TransportError, httpx.HTTPStatusError):
+            if attempt == MAX_DOWNLOAD_ATTEMPTS - 1:
+                raise
+        # Espera exponencial entre intentos: 1s, 2s, 4s... hasta 10s
+        await asyncio.sleep(min(2 ** attempt, 10))
+    if resp.status_code == 304:
+        return None, etag, last_modified
+    resp.raise_for_status()
+    return resp.text, resp.headers.get("etag"), resp.headers.get("last-modified")
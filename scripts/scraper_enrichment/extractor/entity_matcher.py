@@ -0,0 +1,42 @@
+# entity_matcher.py
+import ahocorasick
+
+from auxs.normalized_entities import NORMALIZED_ENTITIES, normalize_entity
+
+# Autómata Aho-Corasick con todas las variaciones en minúsculas, construido una
+# sola vez: cada texto se recorre en una pasada en lugar de buscar variación a variación
+_automaton = ahocorasick.Automaton()
+for _variations in NORMALIZED_ENTITIES.values():
+    for _variation in _variations:
+        _key = _variation.lower()
+        if _key not in _automaton:
+            _automaton.add_word(_key, (normalize_entity(_variation), len(_key)))
+_automaton.make_automaton()
+del _variations, _variation, _key
+
+
+def _is_word_char(c):
+    # Sólo se exige separación de palabra entre letras/dígitos latinos: el tailandés
+    # no separa palabras con espacios
+    return c.isascii() and c.isalnum()
+
+
+def find_entities(text_lower):
+    """Genera (end_index, canonical) por cada variación conocida encontrada en el texto.
+
+    El texto debe venir ya en minúsculas; end_index es la posición del último
+    carácter de la coincidencia en ese texto.
+    """
+    n = len(text_lower)
+    for end_index, (canonical, length) in _automaton.iter(text_lower):
+        start = end_index - length + 1
+        if start > 0 and _is_word_char(text_lower[start - 1]) and _is_word_char(text_lower[start]):
+            continue
+        if end_index + 1 < n and _is_word_char(text_lower[end_index + 1]) and _is_word_char(text_lower[end_index]):
+            continue
+        yield end_index, canonical
+
+
+def known_entities(text):
+    """Nombres normalizados (sin repetir, en orden de aparición) mencionados en el texto."""
+    return list(dict.fromkeys(canonical for _, canonical in find_entities(text.lower())))
@@ -1,10 +1,15 @@
 import os
 import sys
+import asyncio
+import hashlib
+import sqlite3
+import time
 from pathlib import Path
-import json
+import orjson
 from datetime import datetime
-import difflib
 import unicodedata
+from functools import lru_cache
+from rapidfuzz import fuzz
 
 # Eliminar cualquier variable de entorno de proxy antes de cualquier import de openai
 for var in ["HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"]:
@@ -15,6 +20,7 @@ os.environ["no_proxy"] = "*"
 # Añadir la carpeta 'backend' al sys.path para que 'app' sea importable
 sys.path.append(str(Path(__file__).resolve().parents[3] / "backend"))
 from app.config.settings import settings
+from extractor.entity_matcher import known_entities
 
 # Define el schema de la función para function calling
 entity_schema = {
@@ -197,74 +203,145 @@ entity_schema = {
   }
 }
 
+def _strip_descriptions(schema):
+    """Copia del schema sin las anotaciones "description" (las propiedades llamadas
+    "description" se mantienen: su valor es un schema, no un texto)."""
+    if isinstance(schema, dict):
+        return {k: _strip_descriptions(v) for k, v in schema.items()
+                if not (k == "description" and isinstance(v, str))}
+    if isinstance(schema, list):
+        return [_strip_descriptions(v) for v in schema]
+    return schema
 
+# Argumentos constantes de cada llamada, construidos una sola vez
+_TOOLS = [{"type": "function", "function": entity_schema}]
+# Variante reducida (config "slim_schema"): menos tokens de prompt por chunk
+_SLIM_TOOLS = [{"type": "function", "function": {**entity_schema, "parameters": _strip_descriptions(entity_schema["parameters"])}}]
+_TOOL_CHOICE = {"type": "function", "function": {"name": entity_schema["name"]}}
 
+# Variante por lotes (config "chunks_per_call" > 1): varios chunks en una sola
+# llamada, con un array de entidades por chunk en el mismo orden
+def _batch_tools(parameters):
+    return [{"type": "function", "function": {
+        "name": "extract_travel_entities_per_chunk",
+        "description": "Extract travel entities from each text chunk separately, in the order of the chunks.",
+        "parameters": {
+            "type": "object",
+            "properties": {"chunks": {"type": "array", "items": parameters}},
+            "required": ["chunks"]
+        }
+    }}]
+
+_BATCH_TOOLS = _batch_tools(entity_schema["parameters"])
+_SLIM_BATCH_TOOLS = _batch_tools(_SLIM_TOOLS[0]["function"]["parameters"])
+_BATCH_TOOL_CHOICE = {"type": "function", "function": {"name": "extract_travel_entities_per_chunk"}}
+
+
+class _CombiningMarkStripper(dict):
+    """Tabla para str.translate que elimina las marcas no espaciadas (categoría Mn).
+
+    Cada carácter se clasifica la primera vez que aparece y queda memorizado.
+    """
+
+    def __missing__(self, codepoint):
+        value = None if unicodedata.category(chr(codepoint)) == 'Mn' else codepoint
+        self[codepoint] = value
+        return value
+
+_strip_marks = _CombiningMarkStripper()
+
+@lru_cache(maxsize=4096)
 def normalize_name(name):
-    name = name.lower()
-    name = ''.join(
-        c for c in unicodedata.normalize('NFD', name)
-        if unicodedata.category(c) != 'Mn'
-    )
-    
-    name = ' '.join(name.split())
-    return name
+    # split()/join colapsa los espacios más rápido que una expresión regular
+    if name.isascii():
+        return ' '.join(name.lower().split())
+    # Sólo el texto no ASCII puede llevar acentos que descomponer
+    return ' '.join(unicodedata.normalize('NFD', name.lower()).translate(_strip_marks).split())
+
+def _item_key(item):
+    """Clave de deduplicación de un elemento de lista (admite elementos no hashables)."""
+    t = type(item)
+    # Las cadenas (el caso habitual) son su propia clave; el resto de escalares
+    # van con su tipo para que 1, "1" y True no se confundan
+    if t is str:
+        return item
+    if t is int or t is float or t is bool or item is None:
+        return (t, item)
+    if t is dict:
+        try:
+            return orjson.dumps(item, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass
+    return (t, str(item))
 
-def deduplicate_entities(entities, entity_types=("city", "site", "hotel"), name_field='name'):
+def _extend_unique(merged, keys, items):
+    for item in items:
+        key = _item_key(item)
+        if key not in keys:
+            keys.add(key)
+            merged.append(item)
+
+def deduplicate_entities(entities, entity_types=("city", "site", "hotel"), name_field='name',
+                         merge_names=True, count_field=None):
     """
     Devuelve (entidades_sin_duplicados, duplicados_log)
+
+    Con merge_names=False se conserva el primer nombre en lugar de acumular las
+    variantes en una lista, y también el primer valor no vacío de cada campo
+    escalar: sólo se unen los campos que ya son listas, así el registro sigue
+    cumpliendo el schema. Con count_field, cada entidad deduplicable guarda en
+    ese campo cuántas veces apareció.
     """
+    # (tipo, nombre normalizado) -> entidad: una ciudad y un sitio con el mismo
+    # nombre son entidades distintas y no se fusionan
     seen = {}
+    # ((tipo, nombre normalizado), campo) -> (lista fusionada, claves ya vistas): cada
+    # elemento se serializa una sola vez aunque la entidad se fusione muchas veces
+    merged_lists = {}
     duplicates_log = []
     result = []
     for ent in entities:
-        if ent.get('entity_type') in entity_types and ent.get(name_field):
-            norm_name = normalize_name(ent[name_field])
-            if norm_name in seen:
-                prev = seen[norm_name]
+        entity_type = ent.get('entity_type')
+        name = ent.get(name_field)
+        if entity_type in entity_types and name:
+            norm_name = normalize_name(name)
+            key = (entity_type, norm_name)
+            prev = seen.get(key)
+            if prev is not None:
+                prev_name = prev[name_field]
                 duplicates_log.append({
-                    'entity_type': ent['entity_type'],
-                    'original_names': [prev[name_field], ent[name_field]],
+                    'entity_type': entity_type,
+                    # Copia: la lista fusionada de nombres sigue creciendo en sitio
+                    'original_names': [prev_name[:] if isinstance(prev_name, list) else prev_name, name],
                     'normalized': norm_name
                 })
+                if count_field:
+                    prev[count_field] += 1
                 for k, v in ent.items():
+                    if k == name_field and not merge_names:
+                        continue
                     if v and v != prev.get(k):
                         if not prev.get(k):
                             prev[k] = v
-                        elif isinstance(prev[k], list) and isinstance(v, list):
-                            # Deduplicar listas, permitiendo elementos no hashables
-                            combined = prev[k] + v
-                            deduped = []
-                            seen_items = set()
-                            for item in combined:
-                                try:
-                                    key = json.dumps(item, sort_keys=True, ensure_ascii=False) if isinstance(item, dict) else str(item)
-                                except Exception:
-                                    key = str(item)
-                                if key not in seen_items:
-                                    seen_items.add(key)
-                                    deduped.append(item)
-                            prev[k] = deduped
-                        elif prev[k] != v:
-                            # Si alguno es lista, combínalos y deduplica
-                            if isinstance(prev[k], list):
-                                combined = prev[k] + ([v] if not isinstance(v, list) else v)
-                            elif isinstance(v, list):
-                                combined = ([prev[k]] if not isinstance(prev[k], list) else prev[k]) + v
+                        elif not merge_names and not isinstance(prev[k], list) and not isinstance(v, list):
+                            # Campo escalar (description, location_text...): se queda el primero
+                            continue
+                        else:
+                            # Combinar valores/listas y deduplicar, reutilizando las
+                            # claves de la fusión anterior si la lista no ha cambiado
+                            cached = merged_lists.get((key, k))
+                            if cached is not None and cached[0] is prev[k]:
+                                merged, keys = cached
                             else:
-                                combined = [prev[k], v]
-                            deduped = []
-                            seen_items = set()
-                            for item in combined:
-                                try:
-                                    key = json.dumps(item, sort_keys=True, ensure_ascii=False) if isinstance(item, dict) else str(item)
-                                except Exception:
-                                    key = str(item)
-                                if key not in seen_items:
-                                    seen_items.add(key)
-                                    deduped.append(item)
-                            prev[k] = deduped
+                                merged, keys = [], set()
+                                _extend_unique(merged, keys, prev[k] if isinstance(prev[k], list) else [prev[k]])
+                                prev[k] = merged
+                                merged_lists[(key, k)] = (merged, keys)
+                            _extend_unique(merged, keys, v if isinstance(v, list) else [v])
             else:
-                seen[norm_name] = ent
+                if count_field:
+                    ent[count_field] = 1
+                seen[key] = ent
         else:
             result.append(ent)
     result.extend(seen.values())
@@ -272,28 +349,53 @@ def deduplicate_entities(entities, entity_types=("city", "site", "hotel"), name_
 
 def save_entities_and_log(url, entities_with_dupes, entities_no_dupes, duplicates_log, output_dir):
     # Guardar entidades (con duplicados, ya que la eliminación será manual)
-    with open(Path(output_dir) / "entities_with_duplicates.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps({"url": url, "entities": entities_with_dupes}, ensure_ascii=False) + "\n")
+    with open(Path(output_dir) / "entities_with_duplicates.jsonl", "ab") as f:
+        f.write(orjson.dumps({"url": url, "entities": entities_with_dupes}, option=orjson.OPT_APPEND_NEWLINE))
     # También guardar en el archivo sin duplicados (mismo contenido por ahora)
-    with open(Path(output_dir) / "entities_no_duplicates.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps({"url": url, "entities": entities_no_dupes}, ensure_ascii=False) + "\n")
+    with open(Path(output_dir) / "entities_no_duplicates.jsonl", "ab") as f:
+        f.write(orjson.dumps({"url": url, "entities": entities_no_dupes}, option=orjson.OPT_APPEND_NEWLINE))
     # El log de duplicados estará vacío ya que la eliminación será manual
-    with open(Path(output_dir) / "merged_entities.jsonl", "a", encoding="utf-8") as f:
-        f.write(json.dumps({"url": url, "merged": duplicates_log}, ensure_ascii=False) + "\n")
+    with open(Path(output_dir) / "merged_entities.jsonl", "ab") as f:
+        f.write(orjson.dumps({"url": url, "merged": duplicates_log}, option=orjson.OPT_APPEND_NEWLINE))
 
 def similar(a, b, threshold=0.85):
     """Devuelve True si los nombres son suficientemente similares."""
-    return difflib.SequenceMatcher(None, a.lower(), b.lower()).ratio() >= threshold
-
-def extract_entities(chunk, config, url, source_name):
-    from openai import AzureOpenAI
-    client = AzureOpenAI(
-        api_key=settings.AZURE_OPENAI_API_KEY,
-        api_version=settings.AZURE_OPENAI_API_VERSION,
-        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-    )
-    prompt = f"""
-Extract structured travel entities from the following text according to the provided JSON schema. The result should be an array of entities, following the detailed format and fields. If there is no information for a field, leave it empty or null.
+    # fuzz.ratio (Indel normalizado, en C++) corta en cuanto no puede alcanzar el umbral
+    cutoff = threshold * 100
+    return fuzz.ratio(a.lower(), b.lower(), score_cutoff=cutoff) >= cutoff
+
+# Máximo de llamadas simultáneas al LLM desde extract_entities_many
+MAX_CONCURRENT_LLM_CALLS = 8
+
+_client = None
+_async_client = None
+
+def _get_client():
+    """Cliente síncrono compartido; se crea en la primera llamada."""
+    global _client
+    if _client is None:
+        from openai import AzureOpenAI
+        _client = AzureOpenAI(
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            api_version=settings.AZURE_OPENAI_API_VERSION,
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        )
+    return _client
+
+def _get_async_client():
+    """Cliente asíncrono compartido; se crea en la primera llamada."""
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncAzureOpenAI
+        _async_client = AsyncAzureOpenAI(
+            api_key=settings.AZURE_OPENAI_API_KEY,
+            api_version=settings.AZURE_OPENAI_API_VERSION,
+            azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        )
+    return _async_client
+
+PROMPT_TEMPLATE = """
+Extract structured travel entities from the following text according to the provided JSON schema. The result should be an array of entities, following the detailed format and fields. If there is no information for a field, omit the field entirely (do not output empty strings, nulls or empty arrays).
 
 DO NOT repeat entities: if an entity appears multiple times in the text, group all information in a single object.
 
@@ -304,23 +406,292 @@ In the 'day_by_day_plan' field of itineraries, each element should be an object
 TEXT:
 {chunk}
 """
-    response = client.chat.completions.create(
+
+# Tokens de respuesta reservados por chunk, y máximo de salida de una llamada
+# (límite del despliegue): acota cuántos chunks caben en una llamada por lotes
+RESPONSE_TOKENS_PER_CHUNK = 4096
+MAX_RESPONSE_TOKENS = 16384
+
+HINT_TEMPLATE = "Known entities already present in the text (use these exact names): {names}\n"
+
+def _build_request(chunk, config):
+    """Argumentos de chat.completions.create para extraer entidades de un chunk."""
+    prompt = PROMPT_TEMPLATE.format(chunk=chunk)
+    if config.get("entity_hints", False):
+        # Nombres canónicos ya localizados por el autómata: el LLM no tiene que
+        # inventar variantes que luego haya que deduplicar
+        names = known_entities(chunk)
+        if names:
+            prompt = HINT_TEMPLATE.format(names=", ".join(sorted(names))) + prompt
+    return dict(
         model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
         messages=[
             {"role": "system", "content": "Eres un extractor de información de viajes."},
             {"role": "user", "content": prompt}
         ],
-        max_tokens=4096,
+        max_tokens=RESPONSE_TOKENS_PER_CHUNK,
         temperature=0.2,
-        tools=[{"type": "function", "function": entity_schema}],
-        tool_choice={"type": "function", "function": {"name": "extract_travel_entities"}}
+        tools=_SLIM_TOOLS if config.get("slim_schema", False) else _TOOLS,
+        tool_choice=_TOOL_CHOICE
     )
+
+BATCH_TEMPLATE = ("The text below contains {n} chunks, each starting with a '---CHUNK i---' line. "
+                  "Return exactly one element in 'chunks' per chunk, in the same order, with the entities of that chunk only.\n")
+
+def _build_batch_request(chunks, config):
+    """Como _build_request, pero con todos los `chunks` delimitados en un único prompt."""
+    text = "\n".join(f"---CHUNK {i}---\n{chunk}" for i, chunk in enumerate(chunks))
+    request = _build_request(text, config)
+    user_message = request["messages"][-1]
+    user_message["content"] = BATCH_TEMPLATE.format(n=len(chunks)) + user_message["content"]
+    # Cada chunk conserva su propio presupuesto de respuesta
+    request["max_tokens"] = RESPONSE_TOKENS_PER_CHUNK * len(chunks)
+    request["tools"] = _SLIM_BATCH_TOOLS if config.get("slim_schema", False) else _BATCH_TOOLS
+    request["tool_choice"] = _BATCH_TOOL_CHOICE
+    return request
+
+def _compact(value):
+    """Quita de un dict (y de sus dicts anidados) los campos vacíos: None, "", [] y {}.
+
+    El prompt pide omitir los campos sin información, pero el modelo no siempre
+    lo cumple y a veces devuelve claves del schema vacías; conservarlas sólo ocupa
+    memoria mientras se acumulan los resultados. False y 0 se mantienen.
+    """
+    if type(value) is not dict:
+        return value
+    compact = {}
+    for k, v in value.items():
+        v = _compact(v)
+        if v is None or ((type(v) is str or type(v) is list or type(v) is dict) and not v):
+            continue
+        compact[k] = v
+    return compact
+
+def _validated_entities(raw_entities):
+    """Entidades compactadas de un array 'entities' de la respuesta, o ValueError."""
+    if not isinstance(raw_entities, list) or not all(type(e) is dict for e in raw_entities):
+        raise ValueError("'entities' must be an array of objects")
+    return [_compact(e) for e in raw_entities]
+
+def _parse_response(response, url, source_name):
     tool_call = response.choices[0].message.tool_calls[0]
-    function_args = json.loads(tool_call.function.arguments)
-    entities = function_args["entities"]
+    function_args = orjson.loads(tool_call.function.arguments)
+    entities = _validated_entities(function_args["entities"])
     return {
         "url": url,
         "source_name": source_name,
         "scraped_at": datetime.utcnow().isoformat(),
         "entities": entities
-    } 
\ No newline at end of file
+    }
+
+# Cambiar al modificar PROMPT_TEMPLATE, el schema o el post-procesado de la
+# respuesta: invalida las entradas de LLMCache generadas con la versión anterior
+PROMPT_VERSION = "2"
+
+class LLMCache:
+    """Caché en disco (SQLite) de extracciones del LLM, direccionada por contenido.
+
+    La clave es el SHA-256 de la petición completa (modelo, prompt con el chunk,
+    schema) junto con PROMPT_VERSION, así que un chunk sin cambios no vuelve a
+    llamar al LLM en ejecuciones posteriores.
+    """
+
+    def __init__(self, cache_dir):
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(Path(cache_dir) / "llm_cache.db"))
+        self._conn.execute("CREATE TABLE IF NOT EXISTS cache(key TEXT PRIMARY KEY, value BLOB)")
+
+    @staticmethod
+    def key(request):
+        digest = hashlib.sha256(PROMPT_VERSION.encode())
+        digest.update(orjson.dumps(request, option=orjson.OPT_SORT_KEYS))
+        return digest.hexdigest()
+
+    def get(self, key):
+        row = self._conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return orjson.loads(row[0]) if row is not None else None
+
+    def put(self, key, request, result):
+        # Se guarda lo necesario para auditar de dónde salió cada extracción
+        value = {
+            "provider": "azure_openai",
+            "model": request["model"],
+            "prompt_version": PROMPT_VERSION,
+            "ts_utc": datetime.utcnow().isoformat(),
+            "scraped_at": result["scraped_at"],
+            "entities": result["entities"],
+        }
+        # Cada INSERT se confirma por separado: una ejecución interrumpida no deja
+        # entradas a medio escribir
+        self._conn.execute("INSERT OR REPLACE INTO cache(key, value) VALUES (?, ?)", (key, orjson.dumps(value)))
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+def _from_cache(cache, key, url, source_name):
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    return {
+        "url": url,
+        "source_name": source_name,
+        "scraped_at": cached["scraped_at"],
+        "entities": cached["entities"]
+    }
+
+def _parse_batch_response(response, n_chunks):
+    """Entidades por chunk de una respuesta por lotes (siempre `n_chunks` listas)."""
+    tool_call = response.choices[0].message.tool_calls[0]
+    items = orjson.loads(tool_call.function.arguments)["chunks"]
+    if not isinstance(items, list) or not all(type(item) is dict for item in items):
+        raise ValueError("'chunks' must be an array of objects")
+    per_chunk = [_validated_entities(item.get("entities", [])) for item in items]
+    # Si el modelo no respeta el número de chunks no se pierde nada: lo que sobra
+    # se une al último y lo que falta queda vacío
+    if len(per_chunk) > n_chunks:
+        per_chunk[n_chunks - 1:] = [[e for entities in per_chunk[n_chunks - 1:] for e in entities]]
+    per_chunk.extend([] for _ in range(n_chunks - len(per_chunk)))
+    return per_chunk
+
+def _batch_results(per_chunk, scraped_at, url, source_name):
+    return [{
+        "url": url,
+        "source_name": source_name,
+        "scraped_at": scraped_at,
+        "entities": entities
+    } for entities in per_chunk]
+
+# Intentos por chunk cuando la respuesta no se puede parsear. Los 429/5xx y los
+# errores de red ya los reintenta el cliente de openai con su propio backoff
+MAX_EXTRACTION_ATTEMPTS = 3
+# Respuesta mal formada: sin tool call, JSON inválido o estructura inesperada
+_MALFORMED_RESPONSE = (ValueError, KeyError, IndexError, TypeError, AttributeError)
+
+RETRY_TEMPLATE = "Error: {error}. Fix these arguments and call the function again with valid arguments."
+NO_CALL_TEMPLATE = "The previous attempt failed ({error}). Call the function with valid arguments following the schema."
+
+def _retry_messages(messages, response, error):
+    """Conversación para reintentar: la llamada fallida del modelo y el error como
+    respuesta de la herramienta, para que corrija unos argumentos que pueda ver."""
+    error = f"{type(error).__name__}: {error}"
+    try:
+        message = response.choices[0].message
+        tool_calls = message.tool_calls or []
+    except (AttributeError, IndexError):
+        tool_calls = []
+    if not tool_calls:
+        # No hay salida que corregir: se repite la petición como instrucción nueva
+        return messages + [{"role": "user", "content": NO_CALL_TEMPLATE.format(error=error)}]
+    return messages + [{
+        "role": "assistant",
+        "content": message.content,
+        "tool_calls": [{
+            "id": tc.id,
+            "type": "function",
+            "function": {"name": tc.function.name, "arguments": tc.function.arguments}
+        } for tc in tool_calls]
+    }] + [{"role": "tool", "tool_call_id": tc.id, "content": RETRY_TEMPLATE.format(error=error)}
+          for tc in tool_calls]
+
+def _create_validated(request, parse):
+    """Llama al LLM y parsea la respuesta con `parse`; si no es válida, repite la
+    llamada con el error añadido a la conversación para que el modelo lo corrija."""
+    messages = request["messages"]
+    for attempt in range(MAX_EXTRACTION_ATTEMPTS):
+        response = _get_client().chat.completions.create(**{**request, "messages": messages})
+        try:
+            return parse(response)
+        except _MALFORMED_RESPONSE as e:
+            if attempt == MAX_EXTRACTION_ATTEMPTS - 1:
+                raise
+            messages = _retry_messages(messages, response, e)
+            time.sleep(1.0 * (attempt + 1))
+
+async def _create_validated_async(request, parse):
+    """Versión asíncrona de _create_validated."""
+    messages = request["messages"]
+    for attempt in range(MAX_EXTRACTION_ATTEMPTS):
+        response = await _get_async_client().chat.completions.create(**{**request, "messages": messages})
+        try:
+            return parse(response)
+        except _MALFORMED_RESPONSE as e:
+            if attempt == MAX_EXTRACTION_ATTEMPTS - 1:
+                raise
+            messages = _retry_messages(messages, response, e)
+            await asyncio.sleep(1.0 * (attempt + 1))
+
+def extract_entities(chunk, config, url, source_name, cache=None):
+    request = _build_request(chunk, config)
+    if cache is not None:
+        key = LLMCache.key(request)
+        result = _from_cache(cache, key, url, source_name)
+        if result is not None:
+            return result
+    result = _create_validated(request, lambda response: _parse_response(response, url, source_name))
+    if cache is not None:
+        cache.put(key, request, result)
+    return result
+
+async def extract_entities_async(chunk, config, url, source_name, cache=None):
+    request = _build_request(chunk, config)
+    if cache is not None:
+        key = LLMCache.key(request)
+        result = _from_cache(cache, key, url, source_name)
+        if result is not None:
+            return result
+    result = await _create_validated_async(request, lambda response: _parse_response(response, url, source_name))
+    if cache is not None:
+        cache.put(key, request, result)
+    return result
+
+async def extract_entities_batch_async(chunks, config, url, source_name, cache=None):
+    """Extrae las entidades de varios chunks con una sola llamada al LLM.
+
+    Devuelve un resultado por chunk, en el mismo orden, como extract_entities_async.
+    """
+    request = _build_batch_request(chunks, config)
+    if cache is not None:
+        key = LLMCache.key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            return _batch_results(cached["entities"], cached["scraped_at"], url, source_name)
+    per_chunk = await _create_validated_async(request, lambda response: _parse_batch_response(response, len(chunks)))
+    scraped_at = datetime.utcnow().isoformat()
+    if cache is not None:
+        cache.put(key, request, {"scraped_at": scraped_at, "entities": per_chunk})
+    return _batch_results(per_chunk, scraped_at, url, source_name)
+
+async def extract_entities_many(chunks, config, url, source_name, concurrency=MAX_CONCURRENT_LLM_CALLS,
+                                semaphore=None, cache=None):
+    """Extrae entidades de todos los chunks de una página en paralelo (como máximo
+    `concurrency` llamadas a la vez). Devuelve los resultados en el orden de los chunks.
+
+    Si se pasa `semaphore`, se usa ese en lugar de uno propio: así varias páginas
+    procesadas a la vez comparten un único límite de llamadas al LLM. Con `cache`
+    (un LLMCache), los chunks ya extraídos antes no llegan a llamar al LLM.
+
+    Con config "chunks_per_call" > 1 se agrupan los chunks consecutivos de ese en
+    ese y cada grupo va en una sola llamada: menos peticiones y menos prompt de
+    sistema y schema repetidos. Cada chunk del grupo mantiene su presupuesto de
+    respuesta, así que el grupo se limita a los que caben en MAX_RESPONSE_TOKENS.
+    """
+    sem = semaphore if semaphore is not None else asyncio.Semaphore(concurrency)
+    per_call = min(config.get("chunks_per_call", 1), MAX_RESPONSE_TOKENS // RESPONSE_TOKENS_PER_CHUNK)
+
+    if per_call <= 1:
+        async def run(chunk):
+            async with sem:
+                return await extract_entities_async(chunk, config, url, source_name, cache)
+
+        return await asyncio.gather(*(run(c) for c in chunks))
+
+    async def run_batch(batch):
+        async with sem:
+            if len(batch) == 1:
+                return [await extract_entities_async(batch[0], config, url, source_name, cache)]
+            return await extract_entities_batch_async(batch, config, url, source_name, cache)
+
+    batches = [chunks[i:i + per_call] for i in range(0, len(chunks), per_call)]
+    results = await asyncio.gather(*(run_batch(b) for b in batches))
+    return [result for batch_results in results for result in batch_results]
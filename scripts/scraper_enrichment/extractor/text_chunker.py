@@ -1,14 +1,18 @@
 # text_chunker.py
+from functools import lru_cache
+
 import tiktoken
 
+@lru_cache(maxsize=8)
+def _encoding(model):
+    # Construir el codificador es caro; se reutiliza entre llamadas
+    return tiktoken.encoding_for_model(model)
+
+def chunk_tokens(text, chunk_size=1200, overlap=50, model="gpt-4-1106-preview"):
+    """Trocea el texto en listas de token ids de chunk_size tokens solapadas en overlap."""
+    tokens = _encoding(model).encode(text)
+    return [tokens[start:start + chunk_size] for start in range(0, len(tokens), chunk_size - overlap)]
+
 def chunk_text(text, chunk_size=1200, overlap=50, model="gpt-4-1106-preview"):
-    enc = tiktoken.encoding_for_model(model)
-    tokens = enc.encode(text)
-    chunks = []
-    start = 0
-    while start < len(tokens):
-        end = min(start + chunk_size, len(tokens))
-        chunk = enc.decode(tokens[start:end])
-        chunks.append(chunk)
-        start += chunk_size - overlap
-    return chunks 
\ No newline at end of file
+    # Mismos cortes que chunk_tokens, decodificados en un solo lote
+    return _encoding(model).decode_batch(chunk_tokens(text, chunk_size, overlap, model))
@@ -1,20 +1,30 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import json
+import orjson
 from pathlib import Path
 import shutil
+import sys
 import threading
 import re
+from collections import defaultdict
+from rapidfuzz import process, fuzz
+
+_OSM_RE = re.compile(r'openstreetmap\.org/(node|way|relation)/(\d+)')
+_OSM_PREFIX = {"node": "N", "way": "W", "relation": "R"}
+
+# Puntuación mínima (token_set_ratio, 0-100) para proponer una agrupación aproximada
+UMBRAL_SIMILITUD = 85
 
 def extract_osm_uid(osm_url: str) -> str:
     """Extrae el identificador OSM de una URL de OpenStreetMap"""
-    match = re.search(r'openstreetmap\.org/(node|way|relation)/(\d+)', osm_url)
+    match = _OSM_RE.search(osm_url)
     if not match:
         raise ValueError("Invalid OSM URL")
     
     osm_type = match.group(1)
     osm_id = match.group(2)
-    prefix = {"node": "N", "way": "W", "relation": "R"}[osm_type]
+    prefix = _OSM_PREFIX[osm_type]
     
     return f"OSM:{prefix}{osm_id}"
 
@@ -34,6 +44,7 @@ class EntidadesEditor:
         # Cargar datos
         self.entidades = self.cargar_entidades()
         self.indice_actual = 0
+        self.reconstruir_indice()
         
         self.crear_interfaz()
         self.mostrar_entidad_actual()
@@ -53,52 +64,142 @@ class EntidadesEditor:
             messagebox.showerror("Error", f"No se pudo crear la copia: {e}")
     
     def cargar_entidades(self):
-        """Carga las entidades desde el archivo de trabajo"""
+        """Carga las entidades desde el archivo de trabajo
+
+        También rellena self.posiciones: (offset, longitud en bytes sin el salto
+        de línea) de la línea de cada entidad, para poder reescribirla en sitio.
+        """
         entidades = []
+        posiciones = []
+        self.posiciones = posiciones
         try:
-            with open(self.archivo_trabajo, 'r', encoding='utf-8') as f:
+            with open(self.archivo_trabajo, 'rb') as f:
+                offset = 0
                 for line in f:
-                    if line.strip():
-                        entidades.append(json.loads(line))
+                    # isspace() comprueba la línea en bytes sin crear una copia
+                    if not line.isspace():
+                        entidades.append(orjson.loads(line))
+                        posiciones.append((offset, len(line.rstrip(b'\r\n'))))
+                    offset += len(line)
             print(f"✅ Cargadas {len(entidades)} entidades desde {self.archivo_trabajo}")
             return entidades
         except Exception as e:
+            posiciones.clear()
             messagebox.showerror("Error", f"No se pudo cargar el archivo: {e}")
             return []
     
     def guardar_entidades(self):
-        """Guarda las entidades en el archivo de trabajo"""
+        """Reescribe el archivo de trabajo completo (compacta las líneas en blanco que dejan
+        las ediciones en sitio y devuelve las entidades al orden de la lista)"""
         try:
-            with open(self.archivo_trabajo, 'w', encoding='utf-8') as f:
-                for entidad in self.entidades:
-                    f.write(json.dumps(entidad, ensure_ascii=False) + '\n')
+            lineas = [orjson.dumps(entidad, option=orjson.OPT_APPEND_NEWLINE) for entidad in self.entidades]
+            with open(self.archivo_trabajo, 'wb') as f:
+                # Una sola escritura con todo el contenido
+                f.write(b''.join(lineas))
+            posiciones = []
+            offset = 0
+            for linea in lineas:
+                posiciones.append((offset, len(linea) - 1))
+                offset += len(linea)
+            self.posiciones = posiciones
             print(f"✅ Entidades guardadas en: {self.archivo_trabajo}")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar: {e}")
     
+    def actualizar_en_disco(self, i):
+        """Escribe sólo la entidad i en el archivo de trabajo, sin reescribir el resto
+
+        Si la nueva versión cabe en su línea se sobrescribe en sitio (rellenando con
+        espacios); si no, la línea antigua se deja en blanco y la entidad se añade al
+        final. "Guardar Ahora" reescribe el archivo completo y lo compacta.
+        """
+        try:
+            nueva = orjson.dumps(self.entidades[i])
+            offset, longitud = self.posiciones[i]
+            with open(self.archivo_trabajo, 'r+b') as f:
+                f.seek(offset)
+                if len(nueva) <= longitud:
+                    f.write(nueva.ljust(longitud))
+                else:
+                    # Línea en blanco: cargar_entidades la ignora
+                    f.write(b' ' * longitud)
+                    fin = f.seek(0, 2)
+                    if fin:
+                        f.seek(fin - 1)
+                        if f.read(1) != b'\n':
+                            f.write(b'\n')
+                            fin += 1
+                    f.write(nueva + b'\n')
+                    self.posiciones[i] = (fin, len(nueva))
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo guardar: {e}")
+    
+    def borrar_en_disco(self, indices):
+        """Deja en blanco en el archivo de trabajo las líneas de las entidades indicadas"""
+        try:
+            with open(self.archivo_trabajo, 'r+b') as f:
+                for i in indices:
+                    offset, longitud = self.posiciones[i]
+                    f.seek(offset)
+                    f.write(b' ' * longitud)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo guardar: {e}")
+    
     def get_key(self, ent):
         """Genera una clave única para agrupar entidades"""
-        tipo = str(ent.get('entity_type', '')).lower()
-        subtipo = str(ent.get('subtype', '')).lower()
-        ciudad = str(ent.get('city', '')).lower()
-        nombre = str(ent.get('name', '')).lower()
-        return (tipo, subtipo, ciudad, nombre)
+        # Una sola cadena (separador \x1f, que no aparece en los campos) en
+        # minúsculas de una vez e internada: las claves iguales comparten objeto
+        clave = "\x1f".join((str(ent.get('entity_type', '')), str(ent.get('subtype', '')),
+                              str(ent.get('city', '')), str(ent.get('name', ''))))
+        return sys.intern(clave.lower())
+    
+    def get_bloque(self, ent):
+        """Clave (tipo, ciudad) del bloque dentro del que se buscan nombres parecidos"""
+        return sys.intern(f"{ent.get('entity_type', '')}\x1f{ent.get('city', '')}".lower())
+    
+    def reconstruir_indice(self):
+        """Reconstruye los índices clave -> posiciones y bloque -> posiciones"""
+        # Las posiciones cambian: el texto formateado guardado deja de valer
+        self.cache_texto = {}
+        self.indice_claves = defaultdict(list)
+        self.indice_bloques = defaultdict(list)
+        for i, entidad in enumerate(self.entidades):
+            self.indice_claves[self.get_key(entidad)].append(i)
+            self.indice_bloques[self.get_bloque(entidad)].append(i)
+    
+    def reemplazar_entidad(self, i, entidad):
+        """Sustituye la entidad en la posición i manteniendo los índices al día"""
+        anterior = self.entidades[i]
+        self.indice_claves[self.get_key(anterior)].remove(i)
+        self.indice_bloques[self.get_bloque(anterior)].remove(i)
+        self.entidades[i] = entidad
+        self.cache_texto.pop(i, None)
+        self.indice_claves[self.get_key(entidad)].append(i)
+        self.indice_bloques[self.get_bloque(entidad)].append(i)
     
     def intentar_agrupar_entidad(self, nueva_entidad):
         """Busca entidades similares para agrupar"""
         if not self.entidades:
             return []
         
+        # Consulta al índice en lugar de recorrer todas las entidades
         nueva_key = self.get_key(nueva_entidad)
-        entidades_similares = []
-        
-        for i, entidad in enumerate(self.entidades):
-            if i != self.indice_actual:  # No comparar consigo misma
-                entidad_key = self.get_key(entidad)
-                if nueva_key == entidad_key:
-                    entidades_similares.append((i, entidad))
+        return [(i, self.entidades[i]) for i in sorted(self.indice_claves.get(nueva_key, ()))
+                if i != self.indice_actual]  # No comparar consigo misma
+    
+    def buscar_similares_aproximadas(self, nueva_entidad, limite=10):
+        """Entidades del mismo tipo y ciudad con un nombre parecido (p. ej. "Wat Pho" y "Wat Pho Temple")"""
+        nombre = str(nueva_entidad.get('name', ''))
+        if not nombre:
+            return []
         
-        return entidades_similares
+        # Sólo se comparan los nombres del mismo bloque (tipo, ciudad)
+        candidatos = {i: str(self.entidades[i].get('name', ''))
+                      for i in self.indice_bloques.get(self.get_bloque(nueva_entidad), ())
+                      if i != self.indice_actual}
+        coincidencias = process.extract(nombre, candidatos, scorer=fuzz.token_set_ratio,
+                                        processor=str.lower, score_cutoff=UMBRAL_SIMILITUD, limit=limite)
+        return [(i, self.entidades[i]) for i in sorted(i for _, _, i in coincidencias)]
     
     def agrupar_entidades_similares(self, nueva_entidad, entidades_similares):
         """Agrupa entidades similares combinando sus datos"""
@@ -108,61 +209,49 @@ class EntidadesEditor:
         # Tomar la nueva entidad como base
         base = dict(nueva_entidad)
         
-        # Combinar datos de todas las entidades similares
-        descripciones = []
-        todas_imagenes = []
-        websites = []
-        todas_urls = []
+        # Combinar datos de todas las entidades similares (dicts como conjuntos
+        # ordenados: sin repetidos y en orden de aparición)
+        descripciones = {}
+        todas_imagenes = {}
+        websites = {}
+        todas_urls = {}
         
-        # Añadir datos de la nueva entidad
-        desc = base.get('description', '').strip()
-        if desc:
-            descripciones.append(desc)
-        
-        imagenes = base.get('images', [])
-        if isinstance(imagenes, list):
-            todas_imagenes.extend(imagenes)
-        
-        website = base.get('official_website', '').strip()
-        if website:
-            websites.append(website)
-        
-        url = base.get('source_url', '').strip()
-        if url:
-            todas_urls.append(url)
-        
-        # Añadir datos de entidades similares
-        for i, entidad in entidades_similares:
+        # Datos de la nueva entidad primero y después los de las similares
+        for entidad in [base] + [e for _, e in entidades_similares]:
             desc = entidad.get('description', '').strip()
-            if desc and desc not in descripciones:
-                descripciones.append(desc)
+            if desc:
+                descripciones[desc] = None
             
             imagenes = entidad.get('images', [])
             if isinstance(imagenes, list):
-                todas_imagenes.extend(imagenes)
+                todas_imagenes.update(dict.fromkeys(imagenes))
             
             website = entidad.get('official_website', '').strip()
-            if website and website not in websites:
-                websites.append(website)
+            if website:
+                websites[website] = None
             
             url = entidad.get('source_url', '').strip()
-            if url and url not in todas_urls:
-                todas_urls.append(url)
+            if url:
+                todas_urls[url] = None
         
         # Actualizar la entidad base
         base['description'] = " | ".join(descripciones)
-        base['images'] = list(set(todas_imagenes))
+        base['images'] = list(todas_imagenes)
         base['official_website'] = " | ".join(websites)
-        base['all_source_urls'] = todas_urls
+        base['all_source_urls'] = list(todas_urls)
         base['appearances'] = len(entidades_similares) + 1
         
         # Reemplazar la entidad actual
         self.entidades[self.indice_actual] = base
         
-        # Eliminar entidades similares (en orden inverso para no afectar índices)
-        indices_a_eliminar = [i for i, _ in sorted(entidades_similares, reverse=True)]
-        for i in indices_a_eliminar:
-            del self.entidades[i]
+        # Eliminar entidades similares reconstruyendo la lista una sola vez
+        indices_a_eliminar = {i for i, _ in entidades_similares}
+        self.borrar_en_disco(indices_a_eliminar)
+        self.entidades = [e for i, e in enumerate(self.entidades) if i not in indices_a_eliminar]
+        self.posiciones = [p for i, p in enumerate(self.posiciones) if i not in indices_a_eliminar]
+        # La entidad agrupada se desplaza tantas posiciones como eliminadas había antes
+        self.indice_actual -= sum(1 for i in indices_a_eliminar if i < self.indice_actual)
+        self.reconstruir_indice()
     
     def crear_interfaz(self):
         """Crea la interfaz gráfica"""
@@ -229,8 +318,11 @@ class EntidadesEditor:
             self.contador_label.config(text="No hay entidades")
             return
         
-        entidad = self.entidades[self.indice_actual]
-        json_str = json.dumps(entidad, indent=2, ensure_ascii=False)
+        # El JSON formateado de cada entidad se genera una vez y se reutiliza al navegar
+        json_str = self.cache_texto.get(self.indice_actual)
+        if json_str is None:
+            json_str = orjson.dumps(self.entidades[self.indice_actual], option=orjson.OPT_INDENT_2).decode()
+            self.cache_texto[self.indice_actual] = json_str
         
         self.text_area.delete(1.0, tk.END)
         self.text_area.insert(1.0, json_str)
@@ -291,14 +383,19 @@ class EntidadesEditor:
                 nuevo_json = edit_text.get(1.0, tk.END).strip()
                 nueva_entidad = json.loads(nuevo_json)
                 
-                # Intentar agrupar automáticamente
+                # Intentar agrupar automáticamente; si no hay coincidencias exactas,
+                # proponer las de nombre parecido
                 entidades_agrupadas = self.intentar_agrupar_entidad(nueva_entidad)
+                tipo_similitud = "similares"
+                if not entidades_agrupadas:
+                    entidades_agrupadas = self.buscar_similares_aproximadas(nueva_entidad)
+                    tipo_similitud = "con nombre parecido"
                 
                 if entidades_agrupadas:
                     # Se encontraron entidades para agrupar
                     respuesta = messagebox.askyesno(
                         "Entidades similares encontradas",
-                        f"Se encontraron {len(entidades_agrupadas)} entidades similares.\n\n"
+                        f"Se encontraron {len(entidades_agrupadas)} entidades {tipo_similitud}.\n\n"
                         f"¿Quieres agruparlas automáticamente?\n\n"
                         f"Entidades encontradas:\n" + 
                         "\n".join([f"• {e.get('name', 'Sin nombre')} (índice {i})" for i, e in entidades_agrupadas])
@@ -310,15 +407,15 @@ class EntidadesEditor:
                         messagebox.showinfo("Éxito", f"Entidades agrupadas correctamente. Se eliminaron {len(entidades_agrupadas)} entidades duplicadas.")
                     else:
                         # Solo actualizar la entidad actual
-                        self.entidades[self.indice_actual] = nueva_entidad
+                        self.reemplazar_entidad(self.indice_actual, nueva_entidad)
                         messagebox.showinfo("Éxito", "Entidad modificada sin agrupar")
                 else:
                     # No se encontraron entidades similares, solo actualizar
-                    self.entidades[self.indice_actual] = nueva_entidad
+                    self.reemplazar_entidad(self.indice_actual, nueva_entidad)
                     messagebox.showinfo("Éxito", "Entidad modificada correctamente")
                 
-                # Guardar automáticamente
-                self.guardar_entidades()
+                # Guardar automáticamente sólo la entidad modificada
+                self.actualizar_en_disco(self.indice_actual)
                 
                 # Actualizar vista
                 self.mostrar_entidad_actual()
@@ -349,15 +446,16 @@ class EntidadesEditor:
         )
         
         if respuesta:
+            # Guardar automáticamente: la línea de la entidad queda en blanco
+            self.borrar_en_disco([self.indice_actual])
             del self.entidades[self.indice_actual]
+            del self.posiciones[self.indice_actual]
+            self.reconstruir_indice()
             
             # Ajustar índice si es necesario
             if self.indice_actual >= len(self.entidades):
                 self.indice_actual = max(0, len(self.entidades) - 1)
             
-            # Guardar automáticamente
-            self.guardar_entidades()
-            
             # Actualizar vista
             self.mostrar_entidad_actual()
             
@@ -367,6 +465,7 @@ class EntidadesEditor:
         """Recarga las entidades desde el archivo"""
         self.entidades = self.cargar_entidades()
         self.indice_actual = 0
+        self.reconstruir_indice()
         self.mostrar_entidad_actual()
         messagebox.showinfo("Éxito", "Entidades recargadas desde el archivo")
     
@@ -404,8 +503,11 @@ class EntidadesEditor:
                 messagebox.showerror("Error Wikidata", "ID de Wikidata debe tener formato Q123456")
                 return
         
-        # Guardar automáticamente
-        self.guardar_entidades()
+        # La entidad se ha modificado en sitio
+        self.cache_texto.pop(self.indice_actual, None)
+        
+        # Guardar automáticamente sólo esta entidad
+        self.actualizar_en_disco(self.indice_actual)
         
         # Actualizar vista
         self.mostrar_entidad_actual()
@@ -1,9 +1,66 @@
-import json
+import re
+import orjson
 import time
+import logging
+import sqlite3
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from urllib.parse import quote
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+# Detalle por consulta en el logger (DEBUG); por pantalla sólo un resumen cada PROGRESS_EVERY sitios
+logger = logging.getLogger(__name__)
+PROGRESS_EVERY = 100
+
+# Hilos que consultan Nominatim a la vez; el límite de peticiones lo pone RateLimiter
+NOMINATIM_WORKERS = 4
+# Entidades leídas como máximo por delante de la última escrita
+MAX_PENDING = 1000
+# Todo sitio contiene este par clave/valor (con o sin espacios); las líneas sin
+# él se copian sin parsear. Buscar sólo '"site"' también acierta con el campo
+# "site" de actividades, eventos e itinerarios
+SITE_MARKER_RE = re.compile(rb'"entity_type"\s*:\s*"site"')
+
+class RateLimiter:
+    """Espacia las llamadas a wait() al menos `interval` segundos entre todos los hilos"""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time)
+            self.next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# Política de uso de Nominatim: como máximo 1 petición por segundo
+_rate_limiter = RateLimiter(1.0)
+
+# Sesión compartida por todos los hilos: una conexión TLS reutilizada por consulta
+_session = requests.Session()
+_session.headers['User-Agent'] = 'TravelApp/1.0 (https://github.com/travelapp)'
+_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=NOMINATIM_WORKERS, max_retries=0))
+
+# Caché en disco de consultas ya resueltas (query normalizada -> primer resultado o null)
+CACHE_DB = "nominatim_cache.db"
+_cache_conn = None
+_cache_lock = threading.Lock()
+
+def _get_cache():
+    """Abre la caché de consultas la primera vez que se usa"""
+    global _cache_conn
+    if _cache_conn is None:
+        _cache_conn = sqlite3.connect(CACHE_DB, check_same_thread=False)
+        _cache_conn.execute("CREATE TABLE IF NOT EXISTS cache(query TEXT PRIMARY KEY, result BLOB)")
+    return _cache_conn
 
 def get_quality_level(importance_score):
     """Determina el nivel de calidad basado en el score de importancia"""
@@ -17,7 +74,28 @@ def get_quality_level(importance_score):
         return "poor"
 
 def search_nominatim(query, max_retries=3):
-    """Busca en Nominatim con rate limiting y reintentos"""
+    """Busca en Nominatim con caché, rate limiting y reintentos"""
+    key = query.lower().strip()
+    with _cache_lock:
+        row = _get_cache().execute("SELECT result FROM cache WHERE query = ?", (key,)).fetchone()
+    if row is not None:
+        # Acierto: ni petición HTTP ni espera del rate limiter
+        return orjson.loads(row[0])
+    
+    try:
+        result = _request_nominatim(query, max_retries)
+    except requests.exceptions.RequestException:
+        # Los fallos de red no se guardan: se reintentará en la próxima ejecución
+        return None
+    
+    with _cache_lock:
+        conn = _get_cache()
+        conn.execute("INSERT OR REPLACE INTO cache(query, result) VALUES (?, ?)", (key, orjson.dumps(result)))
+        conn.commit()
+    return result
+
+def _request_nominatim(query, max_retries):
+    """Consulta Nominatim; lanza RequestException si fallan todos los intentos"""
     base_url = "https://nominatim.openstreetmap.org/search"
     
     for attempt in range(max_retries):
@@ -29,11 +107,8 @@ def search_nominatim(query, max_retries=3):
                 'addressdetails': 1
             }
             
-            headers = {
-                'User-Agent': 'TravelApp/1.0 (https://github.com/travelapp)'
-            }
-            
-            response = requests.get(base_url, params=params, headers=headers, timeout=10)
+            _rate_limiter.wait()
+            response = _session.get(base_url, params=params, timeout=10)
             response.raise_for_status()
             
             results = response.json()
@@ -44,13 +119,11 @@ def search_nominatim(query, max_retries=3):
                 return None
                 
         except requests.exceptions.RequestException as e:
-            print(f"⚠️ Error en intento {attempt + 1}: {e}")
+            logger.warning("⚠️ Error en intento %d: %s", attempt + 1, e)
             if attempt < max_retries - 1:
                 time.sleep(2 ** attempt)  # Backoff exponencial
             else:
-                return None
-    
-    return None
+                raise
 
 def extract_wikipedia_info(nominatim_result):
     """Extrae información de Wikipedia del resultado de Nominatim"""
@@ -66,46 +139,60 @@ def extract_wikipedia_info(nominatim_result):
     
     return wikipedia_info
 
+# Países reconocidos en location_text cuando hierarchy no trae el país
+FALLBACK_COUNTRIES = ('Thailand',)
+
+def site_country(site_data):
+    """País del sitio: la entrada 'country' de hierarchy o, si falta, el de location_text"""
+    country = next((item.get('name', '').strip() for item in site_data.get('hierarchy', [])
+                    if item.get('type') == 'country'), '')
+    if country:
+        return country
+    
+    location_text = site_data.get('location_text', '')
+    return next((c for c in FALLBACK_COUNTRIES if c in location_text), '')
+
 def create_search_queries(site_data):
     """Crea diferentes consultas de búsqueda para un sitio"""
     name = site_data.get('name', '').strip()
     
     # Extraer ciudad
     city = site_data.get('city', '').strip()
-    if not city and site_data.get('subtype') == 'city':
-        city = name  # Si es una ciudad, usar el nombre como ciudad
-    
-    # Extraer país de hierarchy
-    country = ''
-    hierarchy = site_data.get('hierarchy', [])
-    for item in hierarchy:
-        if item.get('type') == 'country':
-            country = item.get('name', '').strip()
-            break
-    
-    # Fallback: usar location_text si no hay país
-    if not country:
-        location_text = site_data.get('location_text', '').strip()
-        if location_text and 'Thailand' in location_text:
-            country = 'Thailand'
     
-    queries = []
+    country = site_country(site_data)
+    
+    # Si la ciudad o el país son el propio sitio, repetirlos no añade ninguna restricción
+    if city.lower() == name.lower():
+        city = ''
+    if country.lower() == name.lower():
+        country = ''
+    
+    candidates = []
     
     # Query 1: nombre + ciudad + país
     if name and city and country:
-        queries.append(('name_city_country', f"{name}, {city}, {country}"))
+        candidates.append(('name_city_country', f"{name}, {city}, {country}"))
     
     # Query 2: nombre + ciudad
     if name and city:
-        queries.append(('name_city', f"{name}, {city}"))
+        candidates.append(('name_city', f"{name}, {city}"))
     
     # Query 3: nombre + país
     if name and country:
-        queries.append(('name_country', f"{name}, {country}"))
+        candidates.append(('name_country', f"{name}, {country}"))
     
     # Query 4: solo nombre
     if name:
-        queries.append(('name_only', name))
+        candidates.append(('name_only', name))
+    
+    # Cada relajación sólo se consulta si es distinta de las anteriores
+    queries = []
+    seen = set()
+    for search_type, query in candidates:
+        key = query.lower()
+        if key not in seen:
+            seen.add(key)
+            queries.append((search_type, query))
     
     return queries
 
@@ -114,7 +201,7 @@ def enrich_site_with_nominatim(site_data):
     queries = create_search_queries(site_data)
     
     for search_type, query in queries:
-        print(f"🔍 Buscando: '{query}' ({search_type})")
+        logger.debug("🔍 Buscando: '%s' (%s)", query, search_type)
         
         result = search_nominatim(query)
         
@@ -146,14 +233,11 @@ def enrich_site_with_nominatim(site_data):
                 }
             }
             
-            print(f"✅ Encontrado: {result.get('display_name', 'N/A')} (score: {importance_score:.2f}, nivel: {quality_level})")
+            logger.debug("✅ Encontrado: %s (score: %.2f, nivel: %s)", result.get('display_name', 'N/A'), importance_score, quality_level)
             return nominatim_data
-        
-        # Rate limiting: esperar 1 segundo entre búsquedas
-        time.sleep(1)
     
     # Si no se encontró nada
-    print(f"❌ No encontrado: {site_data.get('name', 'N/A')}")
+    logger.debug("❌ No encontrado: %s", site_data.get('name', 'N/A'))
     return {
         'found': False,
         'quality_score': 0,
@@ -163,8 +247,12 @@ def enrich_site_with_nominatim(site_data):
         'data': {}
     }
 
-def process_sites_with_nominatim(input_path, output_path):
-    """Procesa todos los sitios con Nominatim y guarda los resultados"""
+def process_sites_with_nominatim(input_path, output_path, num_samples=10):
+    """Procesa todos los sitios con Nominatim y guarda los resultados
+
+    Además de las estadísticas devuelve en 'samples' los primeros num_samples
+    sitios enriquecidos, para show_sample_results sin releer la salida.
+    """
     
     print("🚀 INICIANDO ENRIQUECIMIENTO CON NOMINATIM")
     print("=" * 60)
@@ -172,87 +260,79 @@ def process_sites_with_nominatim(input_path, output_path):
     print(f"📤 Salida: {output_path}")
     print()
     
-    # Cargar datos
-    sites = []
+    # Lectura, enriquecimiento y escritura en streaming: en memoria sólo los contadores
     total_entities = 0
+    total_sites = 0
+    found_count = 0
+    quality_stats = defaultdict(int)
     
-    with open(input_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if line.strip():
-                entity = json.loads(line)
-                total_entities += 1
-                
-                # Solo procesar sitios
-                if entity.get('entity_type') == 'site':
-                    sites.append(entity)
-    
-    print(f"📊 Estadísticas:")
-    print(f"   • Total de entidades: {total_entities}")
-    print(f"   • Sitios a procesar: {len(sites)}")
-    print()
-    
-    # Procesar cada sitio
-    enriched_entities = []
-    processed_count = 0
-    
-    for i, site in enumerate(sites, 1):
-        print(f"🔄 Procesando sitio {i}/{len(sites)}: {site.get('name', 'Sin nombre')}")
-        
-        # Enriquecer con Nominatim
-        nominatim_data = enrich_site_with_nominatim(site)
-        
-        # Añadir datos de Nominatim al sitio
-        site['nominatim_match'] = nominatim_data
-        enriched_entities.append(site)
-        
-        processed_count += 1
-        
-        # Mostrar progreso cada 10 sitios
-        if i % 10 == 0:
-            print(f"📈 Progreso: {i}/{len(sites)} sitios procesados")
-        print()
-    
-    # Cargar todas las entidades originales y actualizar solo los sitios
-    all_entities = []
-    site_index = 0
-    
-    with open(input_path, 'r', encoding='utf-8') as f:
+    # Los sitios se enriquecen en paralelo; pending conserva el orden de entrada
+    # para escribir cada entidad en cuanto ella y las anteriores están listas.
+    # Cada elemento es (sitio, future) o (línea original, None)
+    pending = deque()
+    
+    written_sites = 0
+    samples = []
+    
+    def write_ready(max_pending):
+        nonlocal found_count, written_sites
+        while len(pending) > max_pending:
+            entity, future = pending.popleft()
+            if future is None:
+                out.write(entity)
+                continue
+            # Añadir datos de Nominatim al sitio
+            nominatim_data = future.result()
+            entity['nominatim_match'] = nominatim_data
+            
+            # Contar resultados por calidad
+            if nominatim_data.get('found', False):
+                found_count += 1
+                quality_stats[nominatim_data.get('quality_level', 'unknown')] += 1
+            out.write(orjson.dumps(entity, option=orjson.OPT_APPEND_NEWLINE))
+            
+            # Mostrar progreso cada PROGRESS_EVERY sitios
+            written_sites += 1
+            if len(samples) < num_samples:
+                samples.append(entity)
+            if written_sites % PROGRESS_EVERY == 0:
+                print(f"📈 Progreso: {written_sites} sitios procesados, {found_count} encontrados")
+    
+    with open(input_path, 'rb') as f, open(output_path, 'wb', buffering=1 << 20) as out, \
+            ThreadPoolExecutor(max_workers=NOMINATIM_WORKERS) as pool:
         for line in f:
-            if line.strip():
-                entity = json.loads(line)
+            # isspace() comprueba la línea en bytes sin crear una copia
+            if line.isspace():
+                continue
+            total_entities += 1
+            
+            # Solo procesar sitios; el resto se copia tal cual, y sólo se
+            # parsean las líneas que pueden ser un sitio
+            entity = orjson.loads(line) if SITE_MARKER_RE.search(line) else None
+            if entity is None or entity.get('entity_type') != 'site':
+                pending.append((line if line.endswith(b'\n') else line + b'\n', None))
+            else:
+                total_sites += 1
+                logger.debug("🔄 Procesando sitio %d: %s", total_sites, entity.get('name', 'Sin nombre'))
                 
-                # Si es un sitio, usar la versión enriquecida
-                if entity.get('entity_type') == 'site':
-                    all_entities.append(enriched_entities[site_index])
-                    site_index += 1
-                else:
-                    # Mantener entidades que no son sitios sin cambios
-                    all_entities.append(entity)
-    
-    # Guardar resultados
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for entity in all_entities:
-            f.write(json.dumps(entity, ensure_ascii=False) + '\n')
+                # Enriquecer con Nominatim
+                pending.append((entity, pool.submit(enrich_site_with_nominatim, entity)))
+            
+            write_ready(MAX_PENDING)
+        write_ready(0)
     
     # Estadísticas finales
     print("🎉 PROCESAMIENTO COMPLETADO")
     print("=" * 60)
     
-    # Contar resultados por calidad
-    quality_stats = defaultdict(int)
-    found_count = 0
-    
-    for site in enriched_entities:
-        nominatim_data = site.get('nominatim_match', {})
-        if nominatim_data.get('found', False):
-            found_count += 1
-            quality_level = nominatim_data.get('quality_level', 'unknown')
-            quality_stats[quality_level] += 1
+    print(f"📊 Estadísticas:")
+    print(f"   • Total de entidades: {total_entities}")
+    print()
     
     print(f"📊 Resultados:")
-    print(f"   • Sitios procesados: {len(sites)}")
+    print(f"   • Sitios procesados: {total_sites}")
     print(f"   • Sitios encontrados: {found_count}")
-    print(f"   • Tasa de éxito: {(found_count/len(sites)*100):.1f}%")
+    print(f"   • Tasa de éxito: {(found_count/total_sites*100 if total_sites else 0):.1f}%")
     print()
     print(f"🏆 Calidad de matches:")
     for level, count in sorted(quality_stats.items(), key=lambda x: x[1], reverse=True):
@@ -262,46 +342,55 @@ def process_sites_with_nominatim(input_path, output_path):
     print(f"\n💾 Archivo guardado en: {output_path}")
     
     return {
-        'total_sites': len(sites),
+        'total_sites': total_sites,
         'found_sites': found_count,
-        'success_rate': found_count/len(sites) if sites else 0,
-        'quality_stats': dict(quality_stats)
+        'success_rate': found_count/total_sites if total_sites else 0,
+        'quality_stats': dict(quality_stats),
+        'samples': samples
     }
 
-def show_sample_results(output_path, num_samples=5):
-    """Muestra ejemplos de resultados enriquecidos"""
+def _read_sites(path):
+    """Genera los sitios de un JSONL sin parsear el resto de líneas"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if SITE_MARKER_RE.search(line):
+                entity = orjson.loads(line)
+                if entity.get('entity_type') == 'site':
+                    yield entity
+
+def show_sample_results(output_path, num_samples=5, samples=None):
+    """Muestra ejemplos de resultados enriquecidos
+
+    Si se pasan los samples devueltos por process_sites_with_nominatim no se
+    vuelve a abrir el archivo de salida.
+    """
     print(f"\n📋 EJEMPLOS DE RESULTADOS (primeros {num_samples})")
     print("=" * 60)
     
-    sites_shown = 0
-    with open(output_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            if sites_shown >= num_samples:
-                break
-                
-            entity = json.loads(line)
-            if entity.get('entity_type') == 'site':
-                nominatim_data = entity.get('nominatim_match', {})
-                
-                print(f"📍 {entity.get('name', 'Sin nombre')}")
-                print(f"   • Ciudad: {entity.get('city', 'N/A')}")
-                print(f"   • País: {entity.get('country', 'N/A')}")
-                print(f"   • Encontrado: {nominatim_data.get('found', False)}")
-                
-                if nominatim_data.get('found'):
-                    data = nominatim_data.get('data', {})
-                    print(f"   • OSM ID: {data.get('osm_id', 'N/A')}")
-                    print(f"   • Wikipedia: {data.get('wikipedia_id', 'N/A')}")
-                    print(f"   • Coordenadas: {data.get('lat', 'N/A')}, {data.get('lon', 'N/A')}")
-                    print(f"   • Calidad: {nominatim_data.get('quality_level', 'N/A')} ({nominatim_data.get('quality_score', 0):.2f})")
-                    print(f"   • Búsqueda usada: {nominatim_data.get('search_used', 'N/A')}")
-                else:
-                    print(f"   • No encontrado en Nominatim")
-                
-                print()
-                sites_shown += 1
+    sites = _read_sites(output_path) if samples is None else samples
+    for entity in islice(sites, num_samples):
+        nominatim_data = entity.get('nominatim_match', {})
+        
+        print(f"📍 {entity.get('name', 'Sin nombre')}")
+        print(f"   • Ciudad: {entity.get('city', 'N/A')}")
+        print(f"   • País: {entity.get('country', 'N/A')}")
+        print(f"   • Encontrado: {nominatim_data.get('found', False)}")
+        
+        if nominatim_data.get('found'):
+            data = nominatim_data.get('data', {})
+            print(f"   • OSM ID: {data.get('osm_id', 'N/A')}")
+            print(f"   • Wikipedia: {data.get('wikipedia_id', 'N/A')}")
+            print(f"   • Coordenadas: {data.get('lat', 'N/A')}, {data.get('lon', 'N/A')}")
+            print(f"   • Calidad: {nominatim_data.get('quality_level', 'N/A')} ({nominatim_data.get('quality_score', 0):.2f})")
+            print(f"   • Búsqueda usada: {nominatim_data.get('search_used', 'N/A')}")
+        else:
+            print(f"   • No encontrado en Nominatim")
+        
+        print()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Rutas de archivos
     input_file = r"D:\TravelApp\Project\scripts\data\scraper_enrichment\enriched_data_3.jsonl"
     output_file = r"D:\TravelApp\Project\scripts\data\scraper_enrichment\enriched_data_4.jsonl"
@@ -310,4 +399,4 @@ if __name__ == "__main__":
     stats = process_sites_with_nominatim(input_file, output_file)
     
     # Mostrar ejemplos
-    show_sample_results(output_file) 
\ No newline at end of file
+    show_sample_results(output_file, samples=stats['samples'])
\ No newline at end of file
@@ -1,74 +1,269 @@
 import os
-import json
+import re
+import orjson
+import asyncio
+import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from extractor.download_page import download_and_clean
+from urllib.parse import urlparse
+from extractor.download_page import async_client, clean_html, download_html_conditional
 from extractor.text_chunker import chunk_text
-from extractor.llm_extractor import extract_entities
+from extractor.llm_extractor import MAX_CONCURRENT_LLM_CALLS, LLMCache, deduplicate_entities, extract_entities_many
+from extractor.entity_matcher import known_entities
 
 CONFIG_PATH = Path(__file__).parent / 'config.json'
 URLS_PATH = Path(__file__).parent / 'urls_list.jsonl'
-OUTPUT_PATH = Path(r'D:/TravelApp/Project/scripts/data/scraper_enrichment/enriched_data.jsonl')
-OUTPUT_DIR = r'D:/TravelApp/Project/scripts/data/scraper_enrichment'
+# Por defecto scripts/data/scraper_enrichment; ENRICHED_OUT permite otra ruta por
+# máquina o por proceso sin tocar el código
+OUTPUT_PATH = Path(os.environ.get('ENRICHED_OUT',
+                                  Path(__file__).resolve().parent.parent / 'data' / 'scraper_enrichment' / 'enriched_data.jsonl'))
+CACHE_DIR = Path(__file__).parent / 'cache'
 
 
 def load_config():
-    # Configuración sigue en JSON normal
-    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    with open(CONFIG_PATH, 'rb') as f:
+        return orjson.loads(f.read())
 
+@lru_cache(maxsize=4096)
 def get_source_name(url):
-    from urllib.parse import urlparse
     return urlparse(url).netloc
 
-def load_existing_results():
-    """Carga las entradas existentes en el archivo JSONL de salida y las devuelve como un dict por URL."""
+# Tipos de entidad con nombre propio que se fusionan dentro de una página cuando
+# coinciden tipo y nombre normalizado (config "merge_duplicates")
+MERGED_ENTITY_TYPES = ("site", "activity", "event", "festival")
+
+# Campos de un registro anterior que necesita la ejecución siguiente
+PREVIOUS_FIELDS = ('content_sha256', 'etag', 'last_modified')
+
+def iter_existing():
+    """Recorre uno a uno los registros del archivo JSONL de salida, sin cargarlos todos."""
+    if not OUTPUT_PATH.exists():
+        return
+    with open(OUTPUT_PATH, 'rb') as f:
+        for line in f:
+            # Cada registro es un objeto en una línea; lo demás (líneas vacías) se salta sin parsear
+            if line[:1] != b'{':
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # Última línea cortada por una ejecución interrumpida
+                continue
+
+def load_existing_results(urls):
+    """Estado previo (hash del contenido y validadores HTTP) de las URLs de esta ejecución, por URL.
+
+    El archivo sólo crece (cada ejecución añade al final), así que si una URL
+    aparece varias veces gana su última línea. Sólo se retienen PREVIOUS_FIELDS
+    de las URLs que se van a procesar: la memoria depende de la ejecución, no del
+    tamaño del corpus, y las entidades nunca se quedan en memoria.
+    """
+    wanted = set(urls)
     results = {}
-    if OUTPUT_PATH.exists():
-        with open(OUTPUT_PATH, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        data = json.loads(line)
-                        url = data.get('url')
-                        if url:
-                            results[url] = data
-                    except Exception:
-                        continue
+    for data in iter_existing():
+        url = data.get('url')
+        if url in wanted:
+            state = {field: data.get(field) for field in PREVIOUS_FIELDS}
+            # Un registro con entidades es una extracción terminada con éxito
+            state['has_entities'] = bool(data.get('entities'))
+            results[url] = state
     return results
 
-def main():
+def prepare_page(html, chunk_size, overlap, previous_sha256=None):
+    """Trabajo de CPU de una página: limpieza del HTML, entidades conocidas y troceado en tokens.
+
+    Devuelve (content_sha256, known_entities, chunks), o None si el texto limpio
+    coincide con `previous_sha256` y no hace falta volver a extraer la página.
+    """
+    text = clean_html(html)
+    # Si el texto limpio no ha cambiado desde la última ejecución, el resultado
+    # guardado sigue valiendo: ni troceado ni LLM
+    content_sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    if content_sha256 == previous_sha256:
+        return None
+    # Chunks idénticos (cabeceras/pies repetidos) sólo se envían una vez al LLM;
+    # se conserva el orden de la primera aparición
+    chunks = list(dict.fromkeys(chunk_text(text, chunk_size, overlap, "gpt-35-turbo")))
+    # Entidades del diccionario de normalización mencionadas en la página (una pasada)
+    return content_sha256, known_entities(text), chunks
+
+async def main_async(cache_dir=CACHE_DIR, use_cache=True, force=False, force_url=None):
     config = load_config()
+    # Caché de extracciones del LLM: los chunks sin cambios no se vuelven a enviar
+    cache = LLMCache(cache_dir) if use_cache else None
     # Leer URLs desde un archivo JSONL (una URL por línea)
-    with open(URLS_PATH, 'r', encoding='utf-8') as f:
-        urls = [json.loads(line)['url'] if 'url' in json.loads(line) else line.strip() for line in f if line.strip()]
-    OUTPUT_PATH.parent.mkdir(exist_ok=True)
-    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
-    # Cargar resultados existentes para poder reemplazar por URL
-    existing_results = load_existing_results()
-    for url in urls:
-        print(f'Procesando: {url}')
-        try:
-            text = download_and_clean(url)
-            chunks = chunk_text(text, config.get('chunk_size_tokens', 1200), config.get('chunk_overlap', 50), "gpt-35-turbo")
+    urls = []
+    with open(URLS_PATH, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            # Cada línea se parsea una sola vez
+            obj = orjson.loads(line)
+            urls.append(obj['url'] if isinstance(obj, dict) and 'url' in obj else line.strip().decode('utf-8'))
+    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    # Estado de la ejecución anterior para las URLs de esta (hash, ETag...)
+    existing_results = load_existing_results(urls)
+    # Reanudar: las URLs ya extraídas con éxito no se vuelven a tocar salvo con
+    # --force (todas) o --force-url (las que casan con la expresión)
+    if not force:
+        forced = re.compile(force_url) if force_url else None
+        pending = [url for url in urls
+                   if not existing_results.get(url, {}).get('has_entities')
+                   or (forced is not None and forced.search(url))]
+        if len(pending) < len(urls):
+            print(f'Saltando {len(urls) - len(pending)} URLs ya procesadas (usa --force para revisarlas)')
+        urls = pending
+    loop = asyncio.get_running_loop()
+    chunk_size = config.get('chunk_size_tokens', 1200)
+    chunk_overlap = config.get('chunk_overlap', 50)
+    merge_duplicates = config.get('merge_duplicates', True)
+    # Hasta `concurrency` URLs en curso a la vez: mientras una espera la descarga
+    # o el LLM, las demás avanzan
+    semaphore = asyncio.Semaphore(config.get('concurrency', 16))
+    # Límite global de llamadas simultáneas al LLM, compartido por todas las
+    # páginas, ajustado a los límites RPM/TPM del despliegue de Azure OpenAI
+    llm_semaphore = asyncio.Semaphore(config.get('llm_concurrency', MAX_CONCURRENT_LLM_CALLS))
+
+    async def process(url):
+        async with semaphore:
+            print(f'Procesando: {url}')
+            # Un mismo cliente HTTP/2 para todas las descargas
+            previous = existing_results.get(url, {})
+            # GET condicional: si el servidor responde 304 ni siquiera se descarga el cuerpo
+            html, etag, last_modified = await download_html_conditional(
+                client, url, previous.get('etag'), previous.get('last_modified'))
+            if html is None:
+                print(f'  Sin cambios (304): {url}')
+                return None
+            # Limpieza del HTML, hash y troceado se reparten entre los núcleos del
+            # pool: el bucle de eventos sólo espera red y LLM
+            prepared = await loop.run_in_executor(pool, prepare_page, html, chunk_size, chunk_overlap,
+                                                  previous.get('content_sha256'))
+            if prepared is None:
+                print(f'  Sin cambios: {url}')
+                return None
+            content_sha256, page_known_entities, chunks = prepared
+            print(f'  Entidades conocidas en {url}: {len(page_known_entities)}')
+            source_name = get_source_name(url)
+            # Todos los chunks de la página se envían al LLM en paralelo
+            enriched_chunks = await extract_entities_many(chunks, config, url, source_name,
+                                                          semaphore=llm_semaphore, cache=cache)
             all_entities = []
-            for chunk in chunks:
-                enriched = extract_entities(chunk, config, url, get_source_name(url))
+            for enriched in enriched_chunks:
                 all_entities.extend(enriched['entities'])
-            
+            if merge_duplicates:
+                # La misma entidad repetida en varios chunks se guarda una vez, con
+                # sus campos combinados y el número de apariciones en 'mentions';
+                # las variantes aproximadas se siguen revisando a mano en el editor
+                all_entities, _ = deduplicate_entities(all_entities, MERGED_ENTITY_TYPES,
+                                                       merge_names=False, count_field='mentions')
+
             result = {
                 'url': url,
-                'source_name': get_source_name(url),
-                'scraped_at': enriched['scraped_at'],
-                'entities': all_entities  # Guardar todas las entidades, incluyendo duplicados
+                'source_name': source_name,
+                'scraped_at': enriched_chunks[-1]['scraped_at'],
+                'entities': all_entities,
+                'known_entities': page_known_entities,
+                'content_sha256': content_sha256,
+                # Validadores HTTP para el GET condicional de la próxima ejecución
+                'etag': etag,
+                'last_modified': last_modified
             }
-            # Reemplazar (o añadir) la entrada para esta URL
-            existing_results[url] = result
-        except Exception as e:
-            print(f'Error procesando {url}: {e}')
-    # Sobrescribir el archivo con una sola entrada por URL (la más reciente)
-    with open(OUTPUT_PATH, 'w', encoding='utf-8') as out_f:
-        for data in existing_results.values():
-            out_f.write(json.dumps(data, ensure_ascii=False) + '\n')
+            # Se añade al final en cuanto la URL termina: lo procesado sobrevive a
+            # un Ctrl-C o a un fallo. La serialización y la escritura van al hilo
+            # escritor para no frenar el bucle de eventos
+            await loop.run_in_executor(writer, write_result, result)
+
+    def write_result(result):
+        out_f.write(orjson.dumps(result, option=orjson.OPT_APPEND_NEWLINE))
+        out_f.flush()
+
+    # Un único hilo escritor: las líneas de distintas URLs nunca se mezclan
+    with ProcessPoolExecutor() as pool, ThreadPoolExecutor(max_workers=1) as writer, \
+            open(OUTPUT_PATH, 'ab') as out_f:
+        # Si una ejecución anterior se cortó a media línea, el primer registro nuevo
+        # no debe pegarse a ese resto
+        if out_f.tell() and not output_ends_with_newline():
+            out_f.write(b'\n')
+        async with async_client() as client:
+            results = await asyncio.gather(*(process(url) for url in urls), return_exceptions=True)
+    if cache is not None:
+        cache.close()
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            print(f'Error procesando {url}: {result}')
+
+def output_ends_with_newline():
+    with open(OUTPUT_PATH, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+def compact_output(path=OUTPUT_PATH):
+    """Reescribe el JSONL dejando sólo la entrada más reciente de cada URL.
+
+    El archivo crece en cada ejecución porque las URLs reprocesadas se añaden al
+    final; load_existing_results ya se queda con la última, esto sólo recupera
+    espacio. Se recorre dos veces sin cargar los registros en memoria y el
+    resultado sustituye al original de forma atómica.
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    # Primera pasada: posición de la última línea de cada URL
+    latest = {}
+    with open(path, 'rb') as f:
+        offset = 0
+        for line in f:
+            if line.strip():
+                try:
+                    url = orjson.loads(line).get('url')
+                    if url:
+                        latest[url] = offset
+                except orjson.JSONDecodeError:
+                    pass
+            offset += len(line)
+    keep = set(latest.values())
+    # Segunda pasada: copiar sólo esas líneas a un temporal y sustituir el archivo
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        with open(path, 'rb') as f, open(tmp_path, 'wb') as out_f:
+            offset = 0
+            for line in f:
+                if offset in keep:
+                    out_f.write(line if line.endswith(b'\n') else line + b'\n')
+                offset += len(line)
+            # El temporal tiene que estar en disco antes del cambio de nombre: si
+            # no, un corte de luz podría dejar el JSONL vacío en lugar del anterior
+            out_f.flush()
+            os.fsync(out_f.fileno())
+    except BaseException:
+        # El original sigue intacto; no dejar el temporal a medias
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+    print(f'Compactado {path}: {len(keep)} URLs')
+
+def main():
+    parser = argparse.ArgumentParser(description='Descarga las URLs y extrae sus entidades con el LLM.')
+    parser.add_argument('--cache-dir', type=Path, default=CACHE_DIR,
+                        help='Carpeta de la caché de extracciones del LLM')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Llamar siempre al LLM sin leer ni escribir la caché')
+    parser.add_argument('--compact', action='store_true',
+                        help='Sólo compactar el JSONL de salida (una entrada por URL) y salir')
+    parser.add_argument('--force', action='store_true',
+                        help='Revisar también las URLs ya procesadas (las que no han cambiado se siguen saltando por ETag/hash)')
+    parser.add_argument('--force-url', metavar='REGEX',
+                        help='Revisar sólo las URLs ya procesadas que casan con esta expresión regular')
+    args = parser.parse_args()
+    if args.compact:
+        compact_output()
+        return
+    # Un único bucle de eventos para toda la ejecución: el cliente asíncrono del
+    # LLM reutiliza sus conexiones entre URLs
+    asyncio.run(main_async(args.cache_dir, not args.no_cache, args.force, args.force_url))
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
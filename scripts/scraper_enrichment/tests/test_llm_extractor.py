@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test de la fusión de entidades duplicadas del extractor.
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor.llm_extractor import deduplicate_entities
+
+def test_merge_keeps_first_scalar_and_unions_lists():
+    """Modo pipeline: los campos string se quedan con el primer valor y las listas se unen."""
+    entities = [
+        {"entity_type": "site", "name": "Wat Pho", "description": "Temple of the reclining Buddha",
+         "location_text": "Bangkok", "images": ["a.jpg"]},
+        {"entity_type": "site", "name": "Wat Pho", "description": "Famous temple",
+         "location_text": "Bangkok, Thailand", "images": ["a.jpg", "b.jpg"], "official_website": "https://watpho.com"},
+    ]
+    merged, log = deduplicate_entities(entities, ("site",), merge_names=False, count_field="mentions")
+
+    assert len(merged) == 1
+    assert len(log) == 1
+    site = merged[0]
+    assert site["description"] == "Temple of the reclining Buddha"
+    assert site["location_text"] == "Bangkok"
+    assert site["images"] == ["a.jpg", "b.jpg"]
+    assert site["official_website"] == "https://watpho.com"
+    assert site["mentions"] == 2
+
+def test_merge_names_accumulates_variants():
+    """Modo editor: con merge_names=True los valores distintos se siguen acumulando."""
+    entities = [
+        {"entity_type": "site", "name": "Wat Pho", "description": "Temple of the reclining Buddha"},
+        {"entity_type": "site", "name": "Wat  Pho", "description": "Famous temple"},
+    ]
+    merged, _ = deduplicate_entities(entities, ("site",))
+
+    assert merged[0]["name"] == ["Wat Pho", "Wat  Pho"]
+    assert merged[0]["description"] == ["Temple of the reclining Buddha", "Famous temple"]